@@ -1,16 +1,44 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 import ipaddress
+import asyncio
+import bisect
+import collections
+import contextlib
+import contextvars
+import csv
+import functools
+import gc
+import gzip
+import json
+import os
+import pickle
+import random
 import socket
-import requests
+import sqlite3
+import time
+import uuid
+import httpx
+import dns.asyncresolver
+import dns.exception
 import dns.resolver
 import dns.reversename
-import time
-import concurrent.futures
 import re
+from typing import Optional
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Startup: job yang belum selesai dilanjutin (resume_jobs di section JOBS); mirror IRR & VRP lokal di-load di background
+    await resume_jobs()
+    start_irr_mirror_load()
+    watcher = start_vrp_watch()
+    try: yield
+    finally:
+        if watcher is not None: watcher.cancel()
 
-app = FastAPI(docs_url="/api/docs", openapi_url="/api/openapi.json")
+app = FastAPI(docs_url="/api/docs", openapi_url="/api/openapi.json", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,84 +49,1627 @@ app.add_middleware(
 )
 
 # === SECURITY VALIDATOR ===
+# Satu regex precompiled, satu pass per baris: validasi + klasifikasi (v4 / v6 / range / asn) sekalian
+# hasil parse-nya, jadi baris nggak di-parse ulang di hilir. IPv4 & range dirakit langsung dari oktet
+# (tanpa parse string kedua di ipaddress); IPv6 cuma disaring charset-nya di sini, parsing (termasuk bentuk
+# compressed "2001:db8::/32") diserahkan ke ipaddress.
+MAX_INPUT_LEN = 50
+_OCTET = r"(0|[1-9]\d{0,2})"  # range 0-255 dicek setelah match, alternation per oktet bikin regex 2x lebih lambat
+_V4 = r"\.".join([_OCTET] * 4)
+TARGET_RE = re.compile(
+    r"\s*(?:"
+    rf"{_V4}(?:/(\d{{1,2}})|\s*-\s*{_V4})?"
+    r"|([Aa][Ss]\d{1,10})"
+    r"|([0-9A-Fa-f.]*:[0-9A-Fa-f:.]*(?:/\d{1,3})?)"
+    r")\s*$"
+)
+
+def _v4_int(a, b, c, d):
+    a, b, c, d = int(a), int(b), int(c), int(d)
+    if a > 255 or b > 255 or c > 255 or d > 255: return None
+    return (a << 24) | (b << 16) | (c << 8) | d
+
+def parse_target(text):
+    # -> (kind, obj) atau None; obj: ip_network (v4/v6), list CIDR (range), "ASxxx" (asn)
+    if len(text) > MAX_INPUT_LEN: return None
+    m = TARGET_RE.match(text)
+    if not m: return None
+    g = m.groups()
+    if g[0] is not None:
+        start = _v4_int(*g[0:4])
+        if start is None: return None
+        if g[5] is not None:
+            end = _v4_int(*g[5:9])
+            if end is None or start > end: return None
+            return "range", list(ipaddress.summarize_address_range(ipaddress.IPv4Address(start), ipaddress.IPv4Address(end)))
+        plen = int(g[4]) if g[4] else 32
+        if plen > 32: return None
+        return "v4", ipaddress.IPv4Network((start, plen), strict=False)
+    if g[9] is not None: return "asn", g[9].upper()
+    try: net = ipaddress.ip_network(g[10], strict=False)
+    except ValueError: return None
+    return ("v6", net) if net.version == 6 else None
+
 def is_safe_input(text, type="IP"):
-    if len(text) > 50: return False 
-    text = text.strip()
-    
-    if type == "ASN":
-        return bool(re.match(r'^AS\d+$', text, re.IGNORECASE))
-    else:
-        ipv4_pattern = r'^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)(?:\/(?:3[0-2]|[1-2]?[0-9]))?$'
-        ipv6_pattern = r'^([0-9a-fA-F]{1,4}:){1,7}:?([0-9a-fA-F]{1,4})?(\/[0-9]{1,3})?$'
-        range_pattern = r'^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\s*-\s*\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\s*$'
-        return bool(re.match(ipv4_pattern, text)) or bool(re.match(ipv6_pattern, text)) or bool(re.match(range_pattern, text))
+    parsed = parse_target(text)
+    if not parsed: return False
+    return parsed[0] == "asn" if type == "ASN" else parsed[0] != "asn"
+
+# === DEADLINE / BUDGET ===
+# Deadline absolut (loop time) per scan disimpan di contextvar, jadi ikut turun ke semua
+# sub-task; yang dibatasi = nunggunya caller (cached_fetch, gather_with_deadline). Fetch ke upstream sendiri
+# jalan tanpa deadline (lihat SINGLE-FLIGHT) dengan timeout & retry normal, hasilnya tetap masuk cache.
+SCAN_BUDGET = float(os.environ.get("SCAN_BUDGET", "8"))
+SCAN_BUDGET_MAX = float(os.environ.get("SCAN_BUDGET_MAX", "55"))
+SCAN_BUDGET_MIN = float(os.environ.get("SCAN_BUDGET_MIN", "2"))
+SCAN_GRACE = 0.25
+JOB_CIDR_BUDGET = float(os.environ.get("JOB_CIDR_BUDGET", "30"))
+scan_deadline = contextvars.ContextVar("scan_deadline", default=None)
+# Nilai field yang nggak kebagian jawaban karena deadline (bukan "Not Found" palsu)
+TIMED_OUT = "⏱ Timed out"
+
+def deadline_in(seconds):
+    return asyncio.get_running_loop().time() + seconds
+
+def time_left(default=None):
+    deadline = scan_deadline.get()
+    if deadline is None: return default
+    left = max(0.0, deadline - asyncio.get_running_loop().time())
+    return left if default is None else min(default, left)
+
+# === METRICS (PROMETHEUS TEXT FORMAT) ===
+# Registry kecil buatan sendiri (tanpa prometheus_client): counter, histogram, gauge via callback.
+# Angka per instance/proses; di-scrape dari /api/metrics.
+METRIC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRIC_HELP = {
+    "resource_validator_upstream_request_seconds": ("histogram", "Latency of upstream calls (WHOIS, RIPEstat, DNS)."),
+    "resource_validator_upstream_requests_total": ("counter", "Upstream calls by outcome (ok, error, timeout, unavailable)."),
+    "resource_validator_upstream_denied_total": ("counter", "WHOIS answers refused by the registry (access denied / query limit)."),
+    "resource_validator_upstream_bytes_total": ("counter", "Response bytes received from upstreams."),
+    "resource_validator_cache_requests_total": ("counter", "Cache lookups by result (hit, miss, shared in-flight fetch)."),
+    "resource_validator_task_seconds": ("histogram", "Duration of each scan task per CIDR."),
+    "resource_validator_task_errors_total": ("counter", "Errors swallowed inside scan tasks, by step and exception type."),
+    "resource_validator_task_timeouts_total": ("counter", "Scan tasks cut off by the request deadline."),
+    "resource_validator_scan_seconds": ("histogram", "Total scan duration per CIDR."),
+    "resource_validator_upstream_circuit_open": ("gauge", "1 while the upstream circuit breaker is open."),
+    "resource_validator_upstream_rate": ("gauge", "Current adaptive request rate per upstream (requests/s)."),
+    "resource_validator_cache_entries": ("gauge", "Entries in the in-process cache."),
+    "resource_validator_ptr_sweep_cache_entries": ("gauge", "Entries in the separate PTR sweep cache."),
+    "resource_validator_inflight_fetches": ("gauge", "Distinct upstream fetches currently in flight."),
+    "resource_validator_scan_waiting": ("gauge", "Scans (kind=scans) and requests (kind=requests) waiting for a scan slot."),
+}
+
+class Metrics:
+    def __init__(self):
+        self.series = collections.defaultdict(dict)  # name -> {labels: value | [bucket counts, sum, count]}
+        self.gauges = {}  # name -> fn() -> {labels: value}
+
+    def inc(self, name, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self.series[name]
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        hist = self.series[name].get(key)
+        if hist is None: hist = self.series[name][key] = [[0] * len(METRIC_BUCKETS), 0.0, 0]
+        for i, bound in enumerate(METRIC_BUCKETS):
+            if value <= bound:
+                hist[0][i] += 1
+                break
+        hist[1] += value
+        hist[2] += 1
+
+    def gauge(self, name, fn):
+        self.gauges[name] = fn
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs: return ""
+        esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+    def render(self):
+        out = []
+        gauges = {}
+        for name, fn in self.gauges.items():
+            try: gauges[name] = fn()
+            except Exception: gauges[name] = {}
+        for name in sorted(set(self.series) | set(gauges)):
+            kind, help_text = METRIC_HELP.get(name, ("untyped", name))
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(gauges.get(name, {}).items()): out.append(f"{name}{self._labels(labels)} {value}")
+            for labels, value in sorted(self.series.get(name, {}).items()):
+                if kind != "histogram":
+                    out.append(f"{name}{self._labels(labels)} {value}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, n in zip(METRIC_BUCKETS, counts):
+                    cumulative += n
+                    out.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {cumulative}")
+                out.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {count}")
+                out.append(f"{name}_sum{self._labels(labels)} {total}")
+                out.append(f"{name}_count{self._labels(labels)} {count}")
+        return "\n".join(out) + "\n"
+
+metrics = Metrics()
+
+def count_task_error(task, step, exc):
+    metrics.inc("resource_validator_task_errors_total", task=task, step=step, error=type(exc).__name__)
+
+# === TRACING (OPT-IN, ?trace=1) ===
+# Span tree per CIDR, nempel di titik yang sama dengan metrics (task, cache, upstream call).
+# Span aktif disimpan di contextvar; kalau trace mati (None) span() langsung lewat tanpa overhead berarti.
+current_span = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    __slots__ = ("name", "start", "end", "outcome", "attrs", "children")
+
+    def __init__(self, name, **attrs):
+        self.name, self.attrs, self.children = name, attrs, []
+        self.start, self.end, self.outcome = asyncio.get_running_loop().time(), None, None
+
+    def to_dict(self, origin=None):
+        origin = self.start if origin is None else origin
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 1),
+            "duration_ms": None if self.end is None else round((self.end - self.start) * 1000, 1),
+            "outcome": self.outcome or ("running" if self.end is None else "ok"),
+            **self.attrs,
+            "children": [child.to_dict(origin) for child in self.children],
+        }
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+    sp = Span(name, **attrs)
+    parent.children.append(sp)
+    token = current_span.set(sp)
+    try: yield sp
+    except asyncio.TimeoutError:
+        sp.outcome = sp.outcome or "timeout"
+        raise
+    except asyncio.CancelledError:
+        sp.outcome = sp.outcome or "cancelled"
+        raise
+    except Exception as e:
+        sp.outcome = sp.outcome or f"error: {type(e).__name__}"
+        raise
+    finally:
+        sp.end = asyncio.get_running_loop().time()
+        current_span.reset(token)
+
+def count_bytes(upstream, n):
+    metrics.inc("resource_validator_upstream_bytes_total", n, upstream=upstream)
+    sp = current_span.get()
+    if sp is not None: sp.attrs["bytes"] = sp.attrs.get("bytes", 0) + n
 
 # === UTILS ===
-WHOIS_APNIC = "whois.apnic.net"
-WHOIS_RADB = "whois.radb.net"
+WHOIS_APNIC = os.environ.get("WHOIS_APNIC", "whois.apnic.net")
+WHOIS_RADB = os.environ.get("WHOIS_RADB", "whois.radb.net")
+
+WHOIS_PORT = int(os.environ.get("WHOIS_PORT", "43"))
+WHOIS_TIMEOUT = 5
+WHOIS_MAX_RESPONSE = int(os.environ.get("WHOIS_MAX_RESPONSE", str(4 << 20)))
+
+class WhoisBuffer:
+    # Nampung 1 response WHOIS di bytearray (bukan bytes += yang kuadratik), dibatasi ukuran maksimal.
+    # Kalau max_objects diisi, objek RPSL di-parse sambil jalan dan pembacaan boleh berhenti begitu jumlahnya cukup.
+    def __init__(self, max_bytes=WHOIS_MAX_RESPONSE, max_objects=None):
+        self.data = bytearray()
+        self.max_bytes, self.max_objects = max_bytes, max_objects
+        self.parser = RPSLStreamParser() if max_objects else None
+        self.objects = []
+        self.truncated = False
+
+    def feed(self, chunk):
+        # True = udah cukup (kena batas ukuran / jumlah objek), sisa response boleh dibuang
+        if self.parser is None: return self._feed(chunk)
+        # Ngitung objek: masukin per baris biar bisa berhenti pas di batas objek ke-N
+        for line in bytes(chunk).splitlines(keepends=True):
+            if self._feed(line): return True
+        return False
 
-def query_socket(query_str, server=WHOIS_APNIC):
+    def _feed(self, chunk):
+        room = self.max_bytes - len(self.data)
+        if len(chunk) > room: chunk, self.truncated = chunk[:room], True
+        self.data += chunk
+        if self.parser is not None:
+            self.objects.extend(self.parser.feed(bytes(chunk)))
+            if len(self.objects) >= self.max_objects: self.truncated = True
+        return self.truncated
+
+    def text(self):
+        data = self.data
+        # Response kepotong -> buang objek terakhir yang belum lengkap
+        if self.truncated: data = memoryview(data)[:max(0, data.rfind(b"\n\n"), data.rfind(b"\n\r\n"))]
+        return bytes(data).decode('utf-8', errors='ignore')
+
+async def query_socket_oneshot(query_str, server=WHOIS_APNIC, max_objects=None):
+    # Mode lama: 1 koneksi TCP per query, baca sampai server nutup (atau sampai buffer bilang cukup)
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(server, WHOIS_PORT), timeout=WHOIS_TIMEOUT)
+    buf = WhoisBuffer(max_objects=max_objects)
     try:
-        if len(query_str) > 100: return ""
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.settimeout(5) 
-        s.connect((server, 43))
         cmd = f"{query_str}\r\n"
-        s.send(cmd.encode())
-        response = b""
+        writer.write(cmd.encode())
+        await writer.drain()
         while True:
-            data = s.recv(4096)
-            if not data: break
-            response += data
-        s.close()
-        return response.decode('utf-8', errors='ignore')
-    except: return ""
+            data = await asyncio.wait_for(reader.read(65536), timeout=WHOIS_TIMEOUT)
+            if not data or buf.feed(data): break
+    finally:
+        writer.close()
+    return buf.text()
+
+# === WHOIS CLIENT (PERSISTENT POOL) ===
+# APNIC & RADB sama-sama support "-k" (keep-alive): koneksi tetap kebuka, tiap
+# response ditutup 2 baris kosong berturut-turut. Query di-pipeline (ditulis
+# tanpa nunggu response sebelumnya), response dibaca berurutan oleh 1 reader task.
+WHOIS_PERSISTENT = os.environ.get("WHOIS_PERSISTENT", "1") != "0"
+WHOIS_POOL_SIZE = int(os.environ.get("WHOIS_POOL_SIZE", "4"))
+WHOIS_PIPELINE_DEPTH = int(os.environ.get("WHOIS_PIPELINE_DEPTH", "4"))
+WHOIS_IDLE_TTL = float(os.environ.get("WHOIS_IDLE_TTL", "60"))
+
+class WhoisConnection:
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+        self.pending = collections.deque()
+        self.closed = False
+        self.keepalive_sent = False
+        self.last_used = asyncio.get_running_loop().time()
+        self._read_task = asyncio.create_task(self._read_loop())
+
+    def alive(self):
+        if self.closed: return False
+        if not self.pending and asyncio.get_running_loop().time() - self.last_used > WHOIS_IDLE_TTL:
+            self.close()
+            return False
+        return True
+
+    def close(self, exc=None):
+        if self.closed: return
+        self.closed = True
+        try: self.writer.close()
+        except: pass
+        while self.pending:
+            fut, _ = self.pending.popleft()
+            if not fut.done(): fut.set_exception(exc or ConnectionError("whois connection closed"))
+
+    async def query(self, query_str, max_objects=None):
+        fut = asyncio.get_running_loop().create_future()
+        cmd = query_str if self.keepalive_sent else f"-k {query_str}"
+        self.keepalive_sent = True
+        self.pending.append((fut, max_objects))
+        self.last_used = asyncio.get_running_loop().time()
+        try:
+            self.writer.write(f"{cmd}\r\n".encode())
+            await self.writer.drain()
+            return await asyncio.wait_for(asyncio.shield(fut), timeout=WHOIS_TIMEOUT)
+        except BaseException as e:
+            # Stream udah nggak sinkron (response yang telat bakal nyasar ke query berikutnya)
+            self.close(ConnectionError(f"whois query failed: {e!r}"))
+            raise
+        finally:
+            self.last_used = asyncio.get_running_loop().time()
+
+    async def _read_loop(self):
+        buf, blank, has_content = None, 0, False
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line: break
+                if buf is None: buf = WhoisBuffer(max_objects=self.pending[0][1] if self.pending else None)
+                if line.strip():
+                    blank, has_content = 0, True
+                elif has_content:
+                    blank += 1
+                    if blank >= 2:
+                        if not buf.truncated: self._resolve(buf)
+                        buf, blank, has_content = None, 0, False
+                        continue
+                else: continue
+                # Buffer udah penuh/cukup -> response udah dikirim duluan, sisa baris cuma dibuang sampai terminator
+                if not buf.truncated and buf.feed(line): self._resolve(buf)
+        except Exception: pass
+        # Server nutup koneksi: kalau server nggak ngehormatin -k, response terakhir selesai di EOF
+        if has_content and not buf.truncated: self._resolve(buf)
+        self.close()
+
+    def _resolve(self, buf):
+        if not self.pending: return
+        fut, _ = self.pending.popleft()
+        if not fut.done(): fut.set_result(buf.text())
+
+class WhoisPool:
+    def __init__(self, server, port=WHOIS_PORT, size=WHOIS_POOL_SIZE, depth=WHOIS_PIPELINE_DEPTH):
+        self.server, self.port, self.size = server, port, max(1, size)
+        self.conns = []
+        self._opening = 0
+        self.loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.size * max(1, depth))
+
+    async def _open(self):
+        self._opening += 1
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(self.server, self.port), timeout=WHOIS_TIMEOUT)
+        finally:
+            self._opening -= 1
+        conn = WhoisConnection(reader, writer)
+        self.conns.append(conn)
+        return conn
+
+    async def _pick(self):
+        while True:
+            self.conns = [c for c in self.conns if c.alive()]
+            conn = min(self.conns, key=lambda c: len(c.pending), default=None)
+            can_open = len(self.conns) + self._opening < self.size
+            if conn is not None and (not conn.pending or not can_open): return conn
+            if can_open: return await self._open()
+            # Semua slot lagi nunggu handshake, tunggu sebentar
+            await asyncio.sleep(0.01)
+
+    async def query(self, query_str, max_objects=None):
+        async with self._slots:
+            conn = await self._pick()
+            reused = conn.keepalive_sent
+            try: return await conn.query(query_str, max_objects)
+            except (ConnectionError, OSError, asyncio.TimeoutError):
+                # Koneksi lama bisa aja udah diputus server (idle timeout) -> coba sekali lagi
+                if not reused: raise
+            conn = await self._open()
+            return await conn.query(query_str, max_objects)
+
+    def close(self):
+        for c in self.conns: c.close()
+        self.conns = []
+
+_whois_pools = {}
+
+def get_whois_pool(server):
+    pool = _whois_pools.get(server)
+    if pool is None or pool.loop is not asyncio.get_running_loop():
+        pool = _whois_pools[server] = WhoisPool(server)
+    return pool
+
+# === SCAN CONCURRENCY ===
+# Batas CIDR yang di-scan barengan per proses. Nggak ada jeda antar start: trafik ke upstream
+# udah dibatasi token bucket per upstream (di bawah), dan cache hit nggak perlu diperlambat.
+# Slot dibagi round-robin antar request (owner), bukan FIFO: batch 50 baris nggak bikin scan 1 IP
+# dari operator lain ngantri di belakang semuanya sampai budget-nya habis.
+SCAN_CONCURRENCY = int(os.environ.get("SCAN_CONCURRENCY", "8"))
+
+class FairLimiter:
+    def __init__(self, slots):
+        self.free = slots
+        self.queues = collections.OrderedDict()  # owner -> deque future yang nunggu slot
+
+    @property
+    def waiting(self):
+        return sum(len(q) for q in self.queues.values())
+
+    @contextlib.asynccontextmanager
+    async def slot(self, owner=None):
+        if self.free > 0 and not self.queues: self.free -= 1
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            self.queues.setdefault(owner, collections.deque()).append(fut)
+            try: await fut
+            except asyncio.CancelledError:
+                # Slot udah dikasih tapi task keburu di-cancel -> oper ke yang lain
+                if fut.done() and not fut.cancelled(): self._release()
+                else: self._discard(owner, fut)
+                raise
+        try: yield
+        finally: self._release()
+
+    def _discard(self, owner, fut):
+        waiters = self.queues.get(owner)
+        if waiters is None or fut not in waiters: return
+        waiters.remove(fut)
+        if not waiters: del self.queues[owner]
+
+    def _release(self):
+        # Owner paling depan dapat slot, lalu pindah ke belakang antrian owner
+        while self.queues:
+            owner, waiters = next(iter(self.queues.items()))
+            fut = waiters.popleft()
+            if waiters: self.queues.move_to_end(owner)
+            else: del self.queues[owner]
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.free += 1
+
+scan_limiter = FairLimiter(max(1, SCAN_CONCURRENCY))
+metrics.gauge("resource_validator_scan_waiting", lambda: {(("kind", "scans"),): scan_limiter.waiting, (("kind", "requests"),): len(scan_limiter.queues)})
+
+# === UPSTREAM GUARD (TOKEN BUCKET + CIRCUIT BREAKER) ===
+# Limit per upstream (concurrency, request/detik) - berlaku buat scan biasa & job.
+# Cache hit nggak kena limit karena dicek sebelum fetch.
+UPSTREAM_LIMITS = {
+    "whois:apnic": (8, 50.0),
+    "whois:radb": (8, 50.0),
+    "ripestat": (16, 50.0),
+    "dns": (32, 500.0),
+}
+BREAKER_FAILURES = int(os.environ.get("BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("BREAKER_COOLDOWN", "30"))
+UPSTREAM_MIN_RATE = 0.05  # rate nggak turun di bawah 5% rate dasar
+# Balasan WHOIS yang artinya kita lagi di-limit/di-block registry
+WHOIS_DENIED = re.compile(r"access denied|limit exceeded|query rate limit", re.IGNORECASE)
+
+class UpstreamUnavailable(Exception):
+    pass
+
+class UpstreamGuard:
+    # Token bucket (rate adaptif: error -> rate dibagi 2, sukses -> naik pelan-pelan balik ke rate dasar)
+    # + circuit breaker: BREAKER_FAILURES gagal berturut-turut / ditolak registry -> sumber di-skip selama cooldown.
+    def __init__(self, name, concurrency, rate):
+        self.name = name
+        self.base_rate = self.rate = rate
+        self.burst = max(1, concurrency)
+        self.failures = 0
+        self.open_until = 0.0
+        self._sem = asyncio.Semaphore(self.burst)
+        self._tokens = float(self.burst)
+        self._stamp = None
+
+    def is_open(self):
+        return asyncio.get_running_loop().time() < self.open_until
+
+    def check(self):
+        if self.is_open(): raise UpstreamUnavailable(f"{self.name} circuit open")
+
+    async def _take(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            if self._stamp is not None: self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def __aenter__(self):
+        self.check()
+        await self._sem.acquire()
+        try:
+            await self._take()
+            self.check()
+        except BaseException:
+            self._sem.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._sem.release()
+        if exc_type is None: self.success()
+        elif not issubclass(exc_type, (asyncio.CancelledError, UpstreamUnavailable)): self.failure()
+        return False
+
+    def success(self):
+        if self.is_open(): return
+        self.failures = 0
+        self.rate = min(self.base_rate, self.rate + self.base_rate * 0.1)
+
+    def failure(self):
+        self.failures += 1
+        self.rate = max(self.base_rate * UPSTREAM_MIN_RATE, self.rate / 2)
+        # Habis cooldown (half-open) 1 gagal lagi langsung buka circuit lagi, karena failures belum di-reset
+        if self.failures >= BREAKER_FAILURES: self.trip()
+
+    def trip(self):
+        self.rate = max(self.base_rate * UPSTREAM_MIN_RATE, self.rate / 2)
+        self.open_until = asyncio.get_running_loop().time() + BREAKER_COOLDOWN
+
+_upstream_limiters = {}
+
+def upstream_limiter(source):
+    upstream = source if source in UPSTREAM_LIMITS else source.split(':')[0]
+    limiter = _upstream_limiters.get(upstream)
+    if limiter is None:
+        concurrency, rate = UPSTREAM_LIMITS.get(upstream, (SCAN_CONCURRENCY, 50.0))
+        limiter = _upstream_limiters[upstream] = UpstreamGuard(upstream, concurrency, rate)
+    return limiter
+
+@contextlib.asynccontextmanager
+async def upstream_call(source):
+    # Semua call ke upstream lewat sini: limiter/breaker + latency & outcome ke metrics (dan span kalau trace nyala)
+    guard = upstream_limiter(source)
+    outcome, start = "unavailable", None
+    with span(guard.name) as sp:
+        try:
+            async with guard:
+                start, outcome = asyncio.get_running_loop().time(), "error"
+                if sp is not None: sp.attrs["wait_ms"] = round((start - sp.start) * 1000, 1)
+                try:
+                    yield guard
+                    outcome = "ok"
+                except (asyncio.TimeoutError, httpx.TimeoutException):
+                    outcome = "timeout"
+                    raise
+                except asyncio.CancelledError:
+                    outcome = "cancelled"
+                    raise
+        finally:
+            if start is not None: metrics.observe("resource_validator_upstream_request_seconds", asyncio.get_running_loop().time() - start, upstream=guard.name)
+            metrics.inc("resource_validator_upstream_requests_total", upstream=guard.name, outcome=outcome)
+            if sp is not None: sp.outcome = outcome
+
+metrics.gauge("resource_validator_upstream_circuit_open", lambda: {(("upstream", name),): int(g.is_open()) for name, g in _upstream_limiters.items()})
+metrics.gauge("resource_validator_upstream_rate", lambda: {(("upstream", name),): round(g.rate, 3) for name, g in _upstream_limiters.items()})
 
+# === CACHE (LRU IN-PROCESS + SQLITE OPSIONAL) ===
+# TTL per sumber (detik): RPKI/BGP cepet berubah, objek registry jarang berubah.
+CACHE_TTL = {
+    "whois:apnic": 6 * 3600,
+    "whois:radb": 3600,
+    "ripestat:bgp-state": 300,
+    "ripestat:routing-status": 600,
+    "ripestat:network-info": 3600,
+    "ripestat:rpki-roas": 300,
+    "ripestat:as-overview": 6 * 3600,
+    "ripestat:announced-prefixes": 1800,
+    "ripestat:asn-neighbours": 1800,
+    "dns:ptr": 3600,
+}
+CACHE_DEFAULT_TTL = 600
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "5000"))
+CACHE_DB = os.environ.get("CACHE_DB", "")
+_MISS = object()
+
+class LRUCache:
+    def __init__(self, max_entries):
+        self.max_entries = max(1, max_entries)
+        self._data = collections.OrderedDict()
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None: return _MISS
+        expires, value = item
+        if expires < time.time():
+            del self._data[key]
+            return _MISS
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl, expires=None):
+        self._data[key] = (expires or time.time() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries: self._data.popitem(last=False)
+
+class SQLiteCache:
+    def __init__(self, path):
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires REAL, value TEXT)")
+        self.db.execute("DELETE FROM cache WHERE expires < ?", (time.time(),))
+
+    def get(self, key):
+        row = self.db.execute("SELECT expires, value FROM cache WHERE key = ?", (key,)).fetchone()
+        if not row or row[0] < time.time(): return _MISS, 0
+        return json.loads(row[1]), row[0]
+
+    def set(self, key, value, ttl):
+        self.db.execute("INSERT OR REPLACE INTO cache (key, expires, value) VALUES (?, ?, ?)", (key, time.time() + ttl, json.dumps(value)))
+
+class TieredCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, db_path=CACHE_DB):
+        self.memory = LRUCache(max_entries)
+        self.disk = None
+        if db_path:
+            try: self.disk = SQLiteCache(db_path)
+            except Exception as e: print(f"cache db disabled: {e}")
+
+    def get(self, source, query):
+        key = f"{source}|{query}"
+        value = self.memory.get(key)
+        if value is not _MISS or self.disk is None: return value
+        try: value, expires = self.disk.get(key)
+        except: return _MISS
+        if value is not _MISS: self.memory.set(key, value, 0, expires=expires)
+        return value
+
+    def set(self, source, query, value):
+        ttl = CACHE_TTL.get(source, CACHE_DEFAULT_TTL)
+        key = f"{source}|{query}"
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            try: self.disk.set(key, value, ttl)
+            except: pass
+
+cache = TieredCache()
+# Hasil PTR sweep (sampai 256 per prefix) punya LRU sendiri, memory only, biar nggak ngusir entry WHOIS/RIPEstat
+PTR_SWEEP_CACHE_ENTRIES = int(os.environ.get("PTR_SWEEP_CACHE_ENTRIES", "20000"))
+ptr_sweep_cache = TieredCache(max_entries=PTR_SWEEP_CACHE_ENTRIES, db_path="")
+
+# === SINGLE-FLIGHT ===
+# Query identik (source, query) yang lagi jalan barengan cuma dikirim sekali ke upstream;
+# caller lain nunggu task yang sama. Pakai task terpisah + shield biar caller yang
+# di-cancel nggak ikut ngebatalin fetch punya caller lain. Fetch-nya jalan dengan timeout
+# upstream normal (bukan deadline caller pertama); tiap caller cuma membatasi nunggunya sendiri.
+_inflight = {}
+
+async def _fetch_and_store(source, query, fetch, cache_if, store):
+    # Context task ini kopian, jadi reset deadline di sini nggak ngaruh ke caller
+    scan_deadline.set(None)
+    value = await fetch()
+    if cache_if(value): store.set(source, query, value)
+    return value
+
+def _inflight_done(key, task):
+    if _inflight.get(key) is task: del _inflight[key]
+    if not task.cancelled(): task.exception()
+
+async def cached_fetch(source, query, fetch, cache_if=bool, store=None):
+    store = store or cache
+    with span(source, query=query) as sp:
+        value = store.get(source, query)
+        if value is not _MISS: result = "hit"
+        else:
+            key = (source, query)
+            task = _inflight.get(key)
+            if task is None or task.get_loop() is not asyncio.get_running_loop():
+                result = "miss"
+                # Task fetch nyalin context sekarang -> span upstream jadi anak span ini
+                task = asyncio.ensure_future(_fetch_and_store(source, query, fetch, cache_if, store))
+                _inflight[key] = task
+                task.add_done_callback(lambda t: _inflight_done(key, t))
+            else: result = "shared"
+        metrics.inc("resource_validator_cache_requests_total", source=source, result=result)
+        if sp is not None: sp.attrs["cache"] = result
+        if result == "hit": return value
+        return await asyncio.wait_for(asyncio.shield(task), timeout=time_left())
+
+metrics.gauge("resource_validator_cache_entries", lambda: {(): len(cache.memory._data)})
+metrics.gauge("resource_validator_ptr_sweep_cache_entries", lambda: {(): len(ptr_sweep_cache.memory._data)})
+metrics.gauge("resource_validator_inflight_fetches", lambda: {(): len(_inflight)})
+
+# === UPSTREAM CALLS ===
+async def gather_with_deadline(coros, deadline):
+    # coros: {key: coroutine}. Semua jalan barengan dengan 1 deadline bersama;
+    # yang belum selesai dibatalin dan hasilnya asyncio.TimeoutError.
+    tasks = {key: asyncio.ensure_future(coro) for key, coro in coros.items()}
+    if tasks: await asyncio.wait(tasks.values(), timeout=deadline)
+    results = {}
+    for key, task in tasks.items():
+        if not task.done():
+            task.cancel()
+            results[key] = asyncio.TimeoutError(f"{key} missed deadline")
+        elif task.cancelled(): results[key] = asyncio.CancelledError()
+        else: results[key] = task.exception() or task.result()
+    return results
+
+WHOIS_SOURCES = {WHOIS_APNIC: "whois:apnic", WHOIS_RADB: "whois:radb"}
+
+async def query_socket(query_str, server=WHOIS_APNIC, max_objects=None):
+    source = WHOIS_SOURCES.get(server, "whois")
+    async def fetch():
+        try:
+            if len(query_str) > 100: return ""
+            async with upstream_call(source) as guard:
+                raw = None
+                if WHOIS_PERSISTENT:
+                    try: raw = await get_whois_pool(server).query(query_str, max_objects)
+                    except (ConnectionError, OSError, asyncio.TimeoutError): pass
+                if raw is None: raw = await query_socket_oneshot(query_str, server=server, max_objects=max_objects)
+                # Registry nolak (rate limit / access denied) -> buka circuit, jangan di-cache
+                if WHOIS_DENIED.search(raw[:2048]):
+                    guard.trip()
+                    metrics.inc("resource_validator_upstream_denied_total", upstream=guard.name)
+                    return ""
+                count_bytes(guard.name, len(raw))
+                return raw
+        # Timeout & circuit kebuka dilempar ke caller (field-nya jadi timed out / UNKNOWN), error lain = response kosong
+        except (asyncio.TimeoutError, UpstreamUnavailable): raise
+        except Exception: return ""
+    # Response kosong = gagal, jangan di-cache
+    key = f"{server}|{query_str}" if not max_objects else f"{server}|{query_str}|max={max_objects}"
+    return await cached_fetch(source, key, fetch)
+
+# === HTTP CLIENT (GLOBAL POOL) ===
+# 1 AsyncClient buat semua task (keep-alive, TLS handshake cuma sekali per koneksi).
+# HTTP/2 otomatis nyala kalau paket "h2" ke-install (pip install httpx[http2]).
+RIPESTAT_URL = os.environ.get("RIPESTAT_URL", "https://stat.ripe.net").rstrip("/")
+RIPESTAT_DEADLINE = float(os.environ.get("RIPESTAT_DEADLINE", "6"))
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "32"))
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.environ.get("HTTP_BACKOFF", "0.25"))
+try:
+    import h2  # noqa: F401
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+_http_client = None
+_http_client_loop = None
+
+def get_http_client():
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client_loop is not loop:
+        _http_client_loop = loop
+        _http_client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED,
+            limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE, keepalive_expiry=60),
+            headers={"User-Agent": "resource-validator"},
+        )
+    return _http_client
+
+async def http_get_json(url, params=None, timeout=5, source="http"):
+    # Retry + exponential backoff buat error transport, 429 dan 5xx; 4xx lain langsung gagal
+    for attempt in range(HTTP_RETRIES + 1):
+        try:
+            async with upstream_call(source) as guard:
+                resp = await get_http_client().get(url, params=params, timeout=timeout)
+                count_bytes(guard.name, len(resp.content))
+                # 429/5xx dihitung gagal di guard (rate turun, bisa buka circuit); 4xx lain bukan salah upstream
+                if resp.status_code == 429 or resp.status_code >= 500: resp.raise_for_status()
+            resp.raise_for_status()
+            return resp.json()
+        except httpx.HTTPStatusError as e:
+            resp = e.response
+            if attempt == HTTP_RETRIES or (resp.status_code != 429 and resp.status_code < 500): raise
+            retry_after = resp.headers.get("Retry-After", "")
+            delay = min(float(retry_after), 5.0) if retry_after.isdigit() else HTTP_BACKOFF * (2 ** attempt)
+        except httpx.TimeoutException as e:
+            if attempt == HTTP_RETRIES: raise asyncio.TimeoutError(f"{url} timed out") from e
+            delay = HTTP_BACKOFF * (2 ** attempt)
+        except httpx.TransportError:
+            if attempt == HTTP_RETRIES: raise
+            delay = HTTP_BACKOFF * (2 ** attempt)
+        delay *= 0.5 + random.random()
+        await asyncio.sleep(delay)
+
+async def ripestat_get(endpoint, resource, timeout=5):
+    async def fetch():
+        return await http_get_json(f"{RIPESTAT_URL}/data/{endpoint}/data.json", params={"resource": resource}, timeout=timeout, source="ripestat")
+    return await cached_fetch(f"ripestat:{endpoint}", resource, fetch)
+
+# === REVERSE DNS RESOLVER ===
+# Resolver dipakai ulang (bukan bikin baru per lookup). DNS_NAMESERVERS bisa diarahkan ke stub lokal buat testing.
+DNS_NAMESERVERS = [ns.strip() for ns in os.environ.get("DNS_NAMESERVERS", "8.8.8.8").split(",") if ns.strip()]
+DNS_PORT = int(os.environ.get("DNS_PORT", "53"))
+DNS_TIMEOUT = float(os.environ.get("DNS_TIMEOUT", "3"))
+PTR_SWEEP_CONCURRENCY = int(os.environ.get("PTR_SWEEP_CONCURRENCY", "64"))
+PTR_SWEEP_MAX_HOSTS = 256
+_resolver = None
+
+def get_resolver():
+    global _resolver
+    if _resolver is None:
+        _resolver = dns.asyncresolver.Resolver(configure=False)
+        _resolver.nameservers = DNS_NAMESERVERS
+        _resolver.port = DNS_PORT
+        _resolver.lifetime = DNS_TIMEOUT
+    return _resolver
+
+async def resolve_ptr(address, store=None):
+    # "" = NXDOMAIN/no answer, tetap di-cache biar nggak nanya ulang terus
+    async def fetch():
+        rev = dns.reversename.from_address(address)
+        async with upstream_call("dns"):
+            # NXDOMAIN/NoAnswer itu jawaban normal, bukan error upstream
+            try: return str((await get_resolver().resolve(rev, "PTR"))[0])
+            except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer): return ""
+            except dns.exception.Timeout as e: raise asyncio.TimeoutError(f"PTR {address} timed out") from e
+    return await cached_fetch("dns:ptr", address, fetch, cache_if=lambda v: v is not None, store=store)
+
+async def resolve_ptrs(addresses, concurrency=PTR_SWEEP_CONCURRENCY):
+    # Banyak PTR sekaligus; None = lookup gagal (timeout/SERVFAIL), "" = memang nggak ada PTR
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(address):
+        async with sem:
+            try: return address, await resolve_ptr(address, store=ptr_sweep_cache)
+            except: return address, None
+
+    return dict(await asyncio.gather(*(one(str(a)) for a in addresses)))
+
+@functools.lru_cache(maxsize=1 << 16)
 def calculate_size(range_str):
+    # inetnum yang sama muncul lagi di tiap response hierarchy -> di-cache
+    rng = parse_range(range_str)
+    if not rng: return 0
+    # "a - b" dari dulu dihitung end - start (bukan jumlah alamat), dipertahankan biar urutan & threshold nggak geser
+    return rng[2] - rng[1] + ('-' not in range_str)
+
+# === PREFIX ARITHMETIC (BATCH) ===
+# Buat mode bulk (job / import portfolio): ribuan range diproses sekaligus, bukan objek ipaddress per baris.
+# start/end tiap baris disimpan sebagai pasangan uint64 (hi, lo): IPv4 cuma pakai word lo (< 2^32), IPv6 dua-duanya.
+# NumPy opsional (pip install numpy); tanpa NumPy semua method jalan di fallback Python dengan hasil yang sama.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+MASK64 = (1 << 64) - 1
+
+def _split64(values):
+    if not values or max(values) <= MASK64: return np.zeros(len(values), dtype=np.uint64), np.array(values, dtype=np.uint64)
+    return np.array([v >> 64 for v in values], dtype=np.uint64), np.array([v & MASK64 for v in values], dtype=np.uint64)
+
+def _bitlen64(x):
+    # int.bit_length() per elemen uint64. frexp cuma exact sampai 2^53 (selalu kena buat IPv4), di atas itu binary search shift.
+    if not len(x) or x.max() < np.uint64(1 << 53): return np.frexp(x.astype(np.float64))[1].astype(np.int64)
+    n = np.zeros(x.shape, dtype=np.int64)
+    x = x.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = x >= np.uint64(1 << shift)
+        n += big * shift
+        x[big] >>= np.uint64(shift)
+    return n + (x > 0)
+
+def _trailing_zeros64(x):
+    # x = 0 -> 64
+    low = x & (~x + np.uint64(1))
+    return np.where(x == 0, 64, _bitlen64(low) - 1)
+
+def _rank(version, hi, lo):
+    # Koordinat 128-bit (+ version sebagai key teratas) -> key 1 word yang urutannya sama, biar bisa searchsorted / maximum.accumulate.
+    # Kalau semua muat 56 bit (IPv4 / IPv6 kecil) key-nya langsung version << 56 | lo, selain itu rank hasil lexsort.
+    if not len(lo) or (not hi.any() and lo.max() < np.uint64(1 << 56)): return (version.astype(np.uint64) << np.uint64(56)) | lo
+    order = np.lexsort((lo, hi, version))
+    v, h, l = version[order], hi[order], lo[order]
+    step = (v[1:] != v[:-1]) | (h[1:] != h[:-1]) | (l[1:] != l[:-1])
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.concatenate(([0], np.cumsum(step)))
+    return ranks
+
+class PrefixBatch:
+    def __init__(self, ranges):
+        # ranges: (version, start, end) ala parse_range(); None / start > end = baris invalid (dilewati semua operasi)
+        self.ranges = [r if r and r[1] <= r[2] else None for r in ranges]
+        if np is None: return
+        rows = [r or (0, 0, 0) for r in self.ranges]
+        self.version = np.array([r[0] for r in rows], dtype=np.uint8)
+        self.start_hi, self.start_lo = _split64([r[1] for r in rows])
+        self.end_hi, self.end_lo = _split64([r[2] for r in rows])
+        self.valid = self.version != 0
+
+    @classmethod
+    def from_strings(cls, lines):
+        # CIDR atau "a - b" per baris
+        return cls([parse_range(line) for line in lines])
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def sizes(self):
+        # Jumlah alamat per baris (0 = invalid). NumPy: float64, exact buat IPv4, pembulatan buat blok IPv6 > 2^53.
+        if np is None: return [r[2] - r[1] + 1 if r else 0 for r in self.ranges]
+        borrow = (self.end_lo < self.start_lo).astype(np.uint64)
+        d_lo = self.end_lo - self.start_lo
+        d_hi = self.end_hi - self.start_hi - borrow
+        return np.where(self.valid, d_hi.astype(np.float64) * 2.0 ** 64 + d_lo.astype(np.float64) + 1, 0.0)
+
+    def covered_by(self, other):
+        # Per baris: True kalau ada satu range di `other` (version sama) yang membungkus baris ini
+        if np is None:
+            spans = sorted(r for r in other.ranges if r)
+            starts = [(v, s) for v, s, _ in spans]
+            reach, best = [], None
+            for v, _, e in spans:
+                best = max(best, (v, e)) if best else (v, e)
+                reach.append(best)
+            result = []
+            for r in self.ranges:
+                i = bisect.bisect_right(starts, (r[0], r[1])) - 1 if r else -1
+                result.append(i >= 0 and reach[i] >= (r[0], r[2]))
+            return result
+        n, m = len(self), int(other.valid.sum())
+        if not m: return np.zeros(n, dtype=bool)
+        ranks = _rank(
+            np.concatenate((self.version, self.version, other.version[other.valid], other.version[other.valid])),
+            np.concatenate((self.start_hi, self.end_hi, other.start_hi[other.valid], other.end_hi[other.valid])),
+            np.concatenate((self.start_lo, self.end_lo, other.start_lo[other.valid], other.end_lo[other.valid])),
+        )
+        start, end = ranks[:n], ranks[n:2 * n]
+        o_start, o_end = ranks[2 * n:2 * n + m], ranks[2 * n + m:]
+        # Urut by start: range dengan start <= start baris ini yang end-nya paling jauh
+        order = np.argsort(o_start, kind="stable")
+        o_start, reach = o_start[order], np.maximum.accumulate(o_end[order])
+        i = np.searchsorted(o_start, start, side="right") - 1
+        return self.valid & (i >= 0) & (reach[np.maximum(i, 0)] >= end)
+
+    def overlaps(self):
+        # Per baris: True kalau beririsan dengan baris valid lain di batch yang sama (duplikat juga dihitung)
+        if np is None:
+            order = sorted((i for i, r in enumerate(self.ranges) if r), key=lambda i: self.ranges[i])
+            result = [False] * len(self)
+            reach = None
+            for pos, i in enumerate(order):
+                v, s, e = self.ranges[i]
+                if reach and reach >= (v, s): result[i] = True
+                if pos + 1 < len(order) and self.ranges[order[pos + 1]][:2] <= (v, e): result[i] = True
+                reach = max(reach, (v, e)) if reach else (v, e)
+            return result
+        result = np.zeros(len(self), dtype=bool)
+        rows = np.flatnonzero(self.valid)
+        if len(rows) < 2: return result
+        ranks = _rank(
+            np.concatenate((self.version[rows], self.version[rows])),
+            np.concatenate((self.start_hi[rows], self.end_hi[rows])),
+            np.concatenate((self.start_lo[rows], self.end_lo[rows])),
+        )
+        start, end = ranks[:len(rows)], ranks[len(rows):]
+        order = np.lexsort((end, start))
+        start, end = start[order], end[order]
+        reach = np.maximum.accumulate(end)
+        # Kena range sebelumnya (start <= end terjauh sebelumnya) atau range sesudahnya (start berikutnya <= end sendiri)
+        hit = np.zeros(len(rows), dtype=bool)
+        hit[1:] |= start[1:] <= reach[:-1]
+        hit[:-1] |= start[1:] <= end[:-1]
+        result[rows[order]] = hit
+        return result
+
+    def cidr_blocks(self):
+        # Dekomposisi range -> CIDR minimal untuk semua baris sekaligus: tiap putaran, tiap baris yang belum habis
+        # ngeluarin 1 blok (dibatasi alignment alamat sekarang & sisa range), paling banyak 2 x lebar alamat putaran.
+        # -> (row, hi, lo, prefixlen), urut per baris lalu per alamat
+        one, zero = np.uint64(1), np.uint64(0)
+        rows = np.flatnonzero(self.valid)
+        cur_hi, cur_lo = self.start_hi[rows], self.start_lo[rows]
+        end_hi, end_lo = self.end_hi[rows], self.end_lo[rows]
+        width = np.where(self.version[rows] == 4, 32, 128)
+        # Semua muat di word lo (IPv4 / IPv6 kecil) -> aritmetika 1 word, ~2x lebih cepat
+        wide = bool(len(rows)) and bool(cur_hi.any() or end_hi.any())
+        out = []
+        while len(rows):
+            # d = end - cur; blok terbesar yang muat = floor(log2(d + 1))
+            d_lo = end_lo - cur_lo
+            n_lo = d_lo + one
+            if wide:
+                d_hi = end_hi - cur_hi - (end_lo < cur_lo).astype(np.uint64)
+                n_hi = d_hi + (n_lo == 0).astype(np.uint64)
+                exact = ((d_hi & n_hi) == 0) & ((d_lo & n_lo) == 0)
+                bits = np.where(d_hi != 0, 64 + _bitlen64(d_hi), _bitlen64(d_lo))
+                align = np.where(cur_lo != 0, _trailing_zeros64(cur_lo), 64 + _trailing_zeros64(cur_hi))
+            else:
+                exact = (d_lo & n_lo) == 0
+                bits = _bitlen64(d_lo)
+                align = _trailing_zeros64(cur_lo)
+            span = np.where(exact, bits, bits - 1)
+            k = np.minimum(align, span)
+            out.append((rows, cur_hi, cur_lo, width - k))
+            keep = ~(exact & (k == span))
+            # cur += 2^k (blok terakhir tiap baris nggak perlu, jadi k >= 64 cuma kejadian di jalur wide)
+            low = k < 64
+            next_lo = cur_lo + np.where(low, one << np.minimum(k, 63).astype(np.uint64), zero)
+            if wide: cur_hi = cur_hi + np.where(low, zero, one << np.clip(k - 64, 0, 63).astype(np.uint64)) + (next_lo < cur_lo).astype(np.uint64)
+            cur_lo = next_lo
+            rows, cur_hi, cur_lo, end_hi, end_lo, width = rows[keep], cur_hi[keep], cur_lo[keep], end_hi[keep], end_lo[keep], width[keep]
+        if not out: return tuple(np.zeros(0, dtype=t) for t in (np.int64, np.uint64, np.uint64, np.int64))
+        row, hi, lo, plen = (np.concatenate(col) for col in zip(*out))
+        # Putaran ke-i = blok ke-i dalam barisnya, jadi sort stabil per row sudah urut alamat
+        order = np.argsort(row, kind="stable")
+        return row[order], hi[order], lo[order], plen[order]
+
+    def cidr_strings(self):
+        # Semua baris valid -> list string CIDR (urutan input); IPv4 diformat langsung dari integer
+        if np is None:
+            out = []
+            for r in self.ranges:
+                if not r: continue
+                cls = ipaddress.IPv4Address if r[0] == 4 else ipaddress.IPv6Address
+                out.extend(str(net) for net in ipaddress.summarize_address_range(cls(r[1]), cls(r[2])))
+            return out
+        row, hi, lo, plen = self.cidr_blocks()
+        v6 = self.version[row] == 6
+        octets = [((lo >> np.uint64(shift)) & np.uint64(255)).tolist() for shift in (24, 16, 8, 0)]
+        with gc_paused(): out = ["%d.%d.%d.%d/%d" % v4 for v4 in zip(*octets, plen.tolist())]
+        for i in np.flatnonzero(v6).tolist(): out[i] = f"{ipaddress.IPv6Address((int(hi[i]) << 64) | int(lo[i]))}/{plen[i]}"
+        return out
+
+# === RPSL PARSER ===
+# Parser streaming: makan chunk bytes/str (dari socket / file dump) dan keluarin objek yang udah lengkap.
+# Attribute berulang disimpan sebagai list, continuation line (diawali spasi/tab/"+") digabung ke nilai sebelumnya.
+class RPSLObject(dict):
+    __slots__ = ("cls",)
+
+    def __init__(self, cls):
+        super().__init__()
+        self.cls = cls
+
+    def first(self, key, default=""):
+        values = self.get(key)
+        return values[0] if values else default
+
+    def flat(self):
+        # Bentuk lama: {'_class': ..., key: "a | b"}
+        obj = {'_class': self.cls}
+        for key, values in self.items(): obj[key] = " | ".join(values)
+        return obj
+
+# Objek yang punya baris "spesial" (continuation / komentar) lewat jalur lambat baris-per-baris
+RPSL_SLOW_LINE = re.compile(r"(?:^|\n)[ \t+%#]")
+
+class RPSLStreamParser:
+    def __init__(self, encoding="utf-8"):
+        self.encoding = encoding
+        self._pending = None
+
+    def feed(self, data):
+        if self._pending: data = self._pending + data
+        # Cuma proses sampai baris kosong terakhir (batas objek); sisanya ditahan buat chunk berikutnya
+        if isinstance(data, bytes): cut = max(data.rfind(b"\n\n"), data.rfind(b"\n\r\n"))
+        else: cut = max(data.rfind("\n\n"), data.rfind("\n\r\n"))
+        if cut < 0:
+            self._pending = data
+            return []
+        self._pending = data[cut + 1:]
+        text = data[:cut]
+        if isinstance(text, bytes): text = text.decode(self.encoding, errors="ignore")
+        return self._parse(text)
+
+    def close(self):
+        pending, self._pending = self._pending, None
+        if not pending: return []
+        return self._parse(pending.decode(self.encoding, errors="ignore") if isinstance(pending, bytes) else pending)
+
+    def _parse(self, text):
+        if "\r" in text: text = text.replace("\r", "")
+        done = []
+        for block in text.split("\n\n"):
+            if RPSL_SLOW_LINE.search(block):
+                done.extend(self._parse_lines(block))
+                continue
+            # Jalur cepat: objek biasa, tiap baris "key: value"
+            obj = None
+            for line in block.split("\n"):
+                key, sep, val = line.partition(":")
+                if not sep: continue
+                key = key.strip().lower()
+                if obj is None: obj = RPSLObject(key)
+                values = obj.get(key)
+                if values is None: obj[key] = [val.strip()]
+                else: values.append(val.strip())
+            if obj is not None: done.append(obj)
+        return done
+
+    def _parse_lines(self, block):
+        done = []
+        obj = values = None
+        for line in block.split("\n"):
+            c = line[:1]
+            if c in (" ", "\t", "+") and c:
+                rest = line[1:].strip()
+                if rest or c == "+":
+                    if values is not None and rest: values[-1] = f"{values[-1]} {rest}" if values[-1] else rest
+                    continue
+                c = ""  # baris isinya spasi doang = baris kosong
+            if not c or c == "%":
+                # Baris kosong / komentar server = batas objek
+                if obj is not None: done.append(obj)
+                obj = values = None
+                continue
+            if c == "#": continue
+            key, sep, val = line.partition(":")
+            if not sep: continue
+            key = key.strip().lower()
+            if obj is None: obj = RPSLObject(key)
+            values = obj.get(key)
+            if values is None: values = obj[key] = []
+            values.append(val.strip())
+        if obj is not None: done.append(obj)
+        return done
+
+@contextlib.contextmanager
+def gc_paused():
+    # Load dump = jutaan objek kecil yang disimpan; GC siklik cuma bikin lambat (~2x), nyala lagi setelahnya
+    enabled = gc.isenabled()
+    gc.disable()
+    try: yield
+    finally:
+        if enabled: gc.enable()
+
+def iter_rpsl(chunks):
+    parser = RPSLStreamParser()
+    for chunk in chunks: yield from parser.feed(chunk)
+    yield from parser.close()
+
+def parse_rpsl(raw_text):
+    return [obj.flat() for obj in iter_rpsl([raw_text])]
+
+def parse_apnic(raw_text):
+    hierarchy_objs = []
+    for obj in parse_rpsl(raw_text):
+        if 'inetnum' in obj or 'inet6num' in obj:
+            obj['_range'] = obj.get('inetnum', obj.get('inet6num'))
+            hierarchy_objs.append(obj)
+    return hierarchy_objs
+
+# === PREFIX TREE ===
+# Patricia tree (path-compressed) per versi IP, key = integer address. Range "a - b" disimpan di node
+# CIDR terkecil yang membungkus range itu, jadi range yang nggak align CIDR tetap bisa masuk.
+#   covering(x): semua entry yang membungkus x, dari paling spesifik   -> O(prefix length)
+#   covered(x):  semua entry di dalam x                                -> O(prefix length + hasil)
+class PrefixNode:
+    __slots__ = ('prefix', 'plen', 'children', 'entries')
+
+    def __init__(self, prefix, plen):
+        self.prefix, self.plen = prefix, plen
+        self.children = [None, None]
+        self.entries = None
+
+class PrefixTree:
+    WIDTH = {4: 32, 6: 128}
+
+    def __init__(self):
+        self.roots = {4: PrefixNode(0, 0), 6: PrefixNode(0, 0)}
+        self.size = 0
+
+    @staticmethod
+    def key(target):
+        # target: "a - b", CIDR string, ip_network, atau tuple (version, start, end)
+        if isinstance(target, tuple): version, start, end = target
+        elif isinstance(target, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
+            version, start, end = target.version, int(target.network_address), int(target.broadcast_address)
+        else:
+            rng = parse_range(target)
+            if not rng: raise ValueError(f"invalid range: {target}")
+            version, start, end = rng
+        width = PrefixTree.WIDTH[version]
+        plen = width - (start ^ end).bit_length()
+        prefix = (start >> (width - plen)) << (width - plen) if plen else 0
+        return version, start, end, prefix, plen
+
+    @staticmethod
+    def _bit(value, pos, width):
+        return (value >> (width - pos - 1)) & 1
+
+    @staticmethod
+    def _match(node, prefix, width):
+        return node.plen == 0 or (prefix >> (width - node.plen)) == (node.prefix >> (width - node.plen))
+
+    def insert(self, target, value):
+        version, start, end, prefix, plen = self.key(target)
+        width = self.WIDTH[version]
+        node = self.roots[version]
+        entry = (start, end, value)
+        while True:
+            if node.plen == plen:
+                if node.entries is None: node.entries = []
+                node.entries.append(entry)
+                self.size += 1
+                return
+            bit = self._bit(prefix, node.plen, width)
+            child = node.children[bit]
+            if child is None:
+                child = node.children[bit] = PrefixNode(prefix, plen)
+                continue
+            common = min(width - (prefix ^ child.prefix).bit_length(), plen, child.plen)
+            if common == child.plen:
+                node = child
+                continue
+            # Split: sisipin node perantara di panjang prefix yang sama
+            mid = PrefixNode((prefix >> (width - common)) << (width - common) if common else 0, common)
+            mid.children[self._bit(child.prefix, common, width)] = child
+            node.children[bit] = mid
+            node = mid
+
+    def covering(self, target):
+        version, start, end, prefix, plen = self.key(target)
+        width = self.WIDTH[version]
+        node, found = self.roots[version], []
+        while node is not None and node.plen <= plen and self._match(node, prefix, width):
+            if node.entries:
+                found.extend(e for e in node.entries if e[0] <= start and e[1] >= end)
+            if node.plen == plen: break
+            node = node.children[self._bit(prefix, node.plen, width)]
+        # Paling spesifik dulu
+        found.sort(key=lambda e: e[1] - e[0])
+        return found
+
+    def longest_match(self, target):
+        found = self.covering(target)
+        return found[0] if found else None
+
+    def exact(self, target):
+        _, start, end, _, _ = self.key(target)
+        return [e for e in self.covering(target) if e[0] == start and e[1] == end]
+
+    def covered(self, target):
+        version, start, end, prefix, plen = self.key(target)
+        width = self.WIDTH[version]
+        node = self.roots[version]
+        # Turun sampai node pertama yang prefix-nya ada di dalam prefix target
+        while node is not None and node.plen < plen and self._match(node, prefix, width):
+            node = node.children[self._bit(prefix, node.plen, width)]
+        if node is None or node.plen < plen: return []
+        if plen and (node.prefix >> (width - plen)) != (prefix >> (width - plen)): return []
+        found, stack = [], [node]
+        while stack:
+            n = stack.pop()
+            if n.entries: found.extend(e for e in n.entries if e[0] >= start and e[1] <= end)
+            stack.extend(c for c in n.children if c is not None)
+        found.sort(key=lambda e: (e[0], e[0] - e[1]))
+        return found
+
+# === LOCAL APNIC INDEX (OFFLINE DUMP) ===
+# Import dump split DB APNIC (apnic.db.inetnum.gz / apnic.db.inet6num.gz) jadi snapshot:
+#   python api/index.py import-apnic apnic.db.inetnum.gz apnic.db.inet6num.gz -o apnic-index.pickle
+# lalu set APNIC_INDEX=apnic-index.pickle. Snapshot = pickle buatan sendiri, jangan load file orang lain.
+APNIC_INDEX = os.environ.get("APNIC_INDEX", "")
+APNIC_INDEX_KEYS = ('inetnum', 'inet6num', 'netname', 'descr', 'source', '_range')
+
+def _pton4(text):
+    return int.from_bytes(socket.inet_pton(socket.AF_INET, text), 'big')
+
+def _parse_range_v4(range_str):
+    first, sep, last = range_str.partition('-')
+    if sep:
+        start, end = _pton4(first.strip()), _pton4(last.strip())
+        if start > end: raise ValueError(range_str)
+        return 4, start, end
+    addr, slash, plen = range_str.strip().partition('/')
+    addr = _pton4(addr)
+    if not slash: return 4, addr, addr
+    if not (plen.isascii() and plen.isdigit()) or int(plen) > 32: raise ValueError(plen)
+    host = (1 << (32 - int(plen))) - 1
+    return 4, addr & ~host, addr | host
+
+def parse_range(range_str):
+    # Jalur cepat IPv4 (inet_pton di C, ~3x lebih cepat): "a - b", "a/len", "a". IPv6, netmask, input aneh -> ipaddress
+    if ':' not in range_str:
+        try: return _parse_range_v4(range_str)
+        except (OSError, ValueError): pass
     try:
-        if '-' in range_str: 
-            start, end = [x.strip() for x in range_str.split('-')]
-            return int(ipaddress.ip_address(end)) - int(ipaddress.ip_address(start))
+        if '-' in range_str:
+            start, end = [ipaddress.ip_address(x.strip()) for x in range_str.split('-')]
+            # Campur v4/v6 atau kebalik -> bukan range
+            if start.version != end.version or start > end: return None
+            return start.version, int(start), int(end)
+        net = ipaddress.ip_network(range_str.strip(), strict=False)
+        return net.version, int(net.network_address), int(net.broadcast_address)
+    except: return None
+
+def iter_dump_chunks(path, chunk_size=1 << 20):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk: return
+            yield chunk
+
+def iter_dump_objects(path, classes=None):
+    for obj in iter_rpsl(iter_dump_chunks(path)):
+        if classes is None or obj.cls in classes: yield obj
+
+def build_apnic_snapshot(paths):
+    entries = {4: [], 6: []}
+    with gc_paused():
+        for path in paths:
+            for obj in iter_dump_objects(path, classes=('inetnum', 'inet6num')):
+                rng = parse_range(obj.first(obj.cls))
+                if not rng: continue
+                version, start, end = rng
+                entry = {k: " | ".join(obj[k]) for k in APNIC_INDEX_KEYS if k in obj}
+                entry['_range'] = entry[obj.cls]
+                entries[version].append((start, end, entry))
+    return entries
+
+_apnic_index = None
+
+def load_apnic_index(path=APNIC_INDEX):
+    global _apnic_index
+    if _apnic_index is None and path:
+        _apnic_index = PrefixTree()
+        try:
+            with gc_paused():
+                with open(path, 'rb') as f: snapshot = pickle.load(f)
+                for version in (4, 6):
+                    for start, end, obj in snapshot.get(version, []): _apnic_index.insert((version, start, end), obj)
+        except Exception as e:
+            print(f"apnic index disabled: {e}")
+            _apnic_index = PrefixTree()
+    return _apnic_index
+
+def nearest_ancestors(chain, start, end):
+    # chain: (start, end, obj) dari -L, paling spesifik dulu. Yang ditampilin tetap kayak -rB + -l dulu: objek milik
+    # CIDR ini (exact, atau pembungkus terkecil kalau nggak ada) + 1 level di atasnya -> parent nggak lompat ke ancestor teratas
+    ranges = list(dict.fromkeys((e[0], e[1]) for e in chain))
+    keep = set(ranges[:2] if ranges and ranges[0] == (start, end) else ranges[:1])
+    return [e for e in chain if (e[0], e[1]) in keep]
+
+def hierarchy_from_tree(tree, cidr, include_children=True):
+    # Niru jalur live: "-rB -L" (exact / pembungkus terkecil + semua less-specific) dan, kalau diminta,
+    # "-m -rB" (1 level di bawah, dipotong APNIC_CHILDREN_MAX). -> (self_objs, hierarchy, children_capped)
+    # None = prefix nggak ketemu di tree
+    rng = parse_range(cidr)
+    if not rng: return None
+    version, start, end = rng
+    chain = tree.covering(rng)
+    if not chain: return None
+    exact = chain[0] if chain[0][0] == start and chain[0][1] == end else None
+    children = []
+    for e in (tree.covered(rng) if include_children else ()):
+        if e is exact: continue
+        # 1 level di bawah: pembungkus terdekat child-nya bukan range lain yang ada di dalam target
+        parent = next((p for p in tree.covering((version, e[0], e[1])) if p is not e), None)
+        if parent is None or parent is exact or parent[0] < start or parent[1] > end: children.append(e)
+    capped = len(children) >= APNIC_CHILDREN_MAX
+    return [dict(chain[0][2])], [dict(e[2]) for e in nearest_ancestors(chain, start, end) + children[:APNIC_CHILDREN_MAX]], capped
+
+def apnic_index_lookup(cidr, include_children=True):
+    # None = index nggak ada / prefix nggak ketemu -> fallback ke live WHOIS
+    index = load_apnic_index()
+    if not index or not index.size: return None
+    return hierarchy_from_tree(index, cidr, include_children=include_children)
+
+# === LOCAL IRR MIRROR ===
+# IRR_MIRROR_DIR berisi dump route/route6 (radb.db.gz, apnic.db.route.gz, ripe.db.route6.gz, ...)
+# dan journal NRTM (*.nrtm: blok "ADD <serial>" / "DEL <serial>" + objek). Dump di-load dulu,
+# journal di-apply urut nama file.
+IRR_MIRROR_DIR = os.environ.get("IRR_MIRROR_DIR", "")
+
+class IRRMirror:
+    def __init__(self):
+        self.tree = PrefixTree()
+        self.routes = {}
+        self.by_origin = collections.defaultdict(set)
+
+    @property
+    def size(self):
+        return len(self.routes)
+
+    @staticmethod
+    def route_key(obj):
+        # obj = RPSLObject
+        prefix = obj.first('route') or obj.first('route6')
+        origin = obj.first('origin')
+        if not prefix or not origin: return None
+        try: prefix = str(ipaddress.ip_network(prefix.split()[0], strict=False))
+        except: return None
+        source = obj.first('source').split()
+        return prefix, origin.split()[0].upper(), source[0].upper() if source else ''
+
+    def add(self, obj):
+        key = self.route_key(obj)
+        if key is None: return
+        if key not in self.routes: self.tree.insert(key[0], key)
+        self.routes[key] = {"prefix": key[0], "origin": key[1], "source": key[2]}
+        self.by_origin[key[1]].add(key)
+
+    def delete(self, obj):
+        # Entry di tree dibiarin (lazy delete), query selalu dicek ke self.routes
+        key = self.route_key(obj)
+        if key is None or key not in self.routes: return
+        del self.routes[key]
+        self.by_origin[key[1]].discard(key)
+
+    def _resolve(self, entries):
+        return [self.routes[e[2]] for e in dict.fromkeys(entries, None) if e[2] in self.routes]
+
+    def exact(self, prefix):
+        return self._resolve(self.tree.exact(prefix))
+
+    def less_specific(self, prefix):
+        # Termasuk exact match, paling spesifik dulu
+        return self._resolve(self.tree.covering(prefix))
+
+    def more_specific(self, prefix):
+        exact = set(map(id, self.tree.exact(prefix)))
+        return self._resolve([e for e in self.tree.covered(prefix) if id(e) not in exact])
+
+    def by_asn(self, origin):
+        return [self.routes[k] for k in self.by_origin.get(str(origin).upper(), ())]
+
+    def lookup(self, prefix):
+        # Kayak default query RADB: exact match, kalau nggak ada pakai pembungkus terdekat
+        routes = self.exact(prefix)
+        if routes: return routes
+        covering = self.less_specific(prefix)
+        if not covering: return []
+        nearest = covering[0]["prefix"]
+        return [r for r in covering if r["prefix"] == nearest]
+
+    def load_dump(self, path):
+        for obj in iter_dump_objects(path, classes=('route', 'route6')): self.add(obj)
+
+    def apply_journal(self, path):
+        with open(path, encoding='utf-8', errors='ignore') as f:
+            blocks = f.read().split('\n\n')
+        op = None
+        for block in blocks:
+            text = block.strip()
+            if not text or text.startswith('%'): continue
+            head = text.split()[0].upper()
+            if head in ('ADD', 'DEL'):
+                op = head
+                # Kadang objeknya nempel langsung di bawah baris ADD/DEL
+                text = text.split('\n', 1)[1] if '\n' in text else ''
+                if not text: continue
+            for obj in iter_rpsl([text]):
+                if obj.cls not in ('route', 'route6'): continue
+                if op == 'DEL': self.delete(obj)
+                elif op == 'ADD': self.add(obj)
+            op = None
+
+    def load_dir(self, directory):
+        names = sorted(os.listdir(directory))
+        with gc_paused():
+            for name in names:
+                if not name.endswith('.nrtm'): self.load_dump(os.path.join(directory, name))
+            for name in names:
+                if name.endswith('.nrtm'): self.apply_journal(os.path.join(directory, name))
+            # Objek mirror hidup sampai proses mati: freeze biar GC penuh pertama habis load nggak nyapu
+            # jutaan objek ini sekali jalan (~1.5s event loop macet buat dump seukuran RADB)
+            gc.freeze()
+
+# Dump RADB bisa puluhan detik di-parse: load di thread (mulai dari lifespan), mirror baru dipasang kalau load-nya
+# lengkap. Selama belum kepasang mirror-nya kosong -> routing pakai RADB live.
+_irr_mirror = IRRMirror()
+_irr_loader = None
+
+async def load_irr_mirror(directory):
+    global _irr_mirror
+    mirror = IRRMirror()
+    try: await asyncio.to_thread(mirror.load_dir, directory)
+    except Exception as e:
+        print(f"irr mirror disabled: {e}")
+        return
+    _irr_mirror = mirror
+
+def start_irr_mirror_load(directory=IRR_MIRROR_DIR):
+    global _irr_loader
+    if directory and _irr_loader is None: _irr_loader = asyncio.ensure_future(load_irr_mirror(directory))
+    return _irr_loader
+
+def get_irr_mirror():
+    # Nggak pernah nge-block: app tanpa lifespan (mis. ASGITransport) mulai load-nya di sini
+    start_irr_mirror_load()
+    return _irr_mirror
+
+# === RPKI ORIGIN VALIDATION (RFC 6811) ===
+# Export VRP dari Routinator / rpki-client (JSON "roas": [...] atau CSV "ASN,IP Prefix,Max Length,Trust Anchor").
+RPKI_VRP_FILE = os.environ.get("RPKI_VRP_FILE", "")
+# Tiap segini detik mtime file VRP dicek; berubah (export baru dari validator) -> load ulang
+RPKI_VRP_RELOAD = float(os.environ.get("RPKI_VRP_RELOAD", "60"))
+RPKI_LABELS = {"valid": "VALID", "invalid-asn": "INVALID (ASN)", "invalid-length": "INVALID (LENGTH)", "not-found": "NOT FOUND"}
+
+def parse_asn(value):
+    return int(str(value).strip().upper().replace("AS", ""))
+
+def make_vrp(asn, prefix, max_length=None, ta=""):
+    net = ipaddress.ip_network(str(prefix).strip(), strict=False)
+    return {"asn": parse_asn(asn), "prefix": str(net), "max_length": int(max_length) if max_length not in (None, "") else net.prefixlen, "ta": ta}
+
+def load_vrp_file(path):
+    tree = PrefixTree()
+    with gc_paused(), open(path, encoding='utf-8') as f:
+        if path.endswith('.json'):
+            for roa in json.load(f).get('roas', []):
+                try: vrp = make_vrp(roa['asn'], roa['prefix'], roa.get('maxLength', roa.get('max_length')), roa.get('ta', ''))
+                except: continue
+                tree.insert(vrp['prefix'], vrp)
         else:
-            net = ipaddress.ip_network(range_str, strict=False)
-            return int(net.num_addresses)
-    except: return 0
+            for row in csv.reader(f):
+                if len(row) < 3 or not row[0].strip().upper().startswith('AS'): continue
+                try: vrp = make_vrp(row[0], row[1], row[2], row[3] if len(row) > 3 else '')
+                except: continue
+                tree.insert(vrp['prefix'], vrp)
+        # Tree nggak punya cycle, jadi tree lama tetap dibebasin refcount waktu di-swap; freeze cuma biar GC penuh
+        # nggak nyapu ratusan ribu node ini (event loop macet ~1 detik tiap kali)
+        gc.freeze()
+    return tree
+
+# Sama kayak mirror IRR: load di thread (300k VRP JSON ~15 detik), tree baru di-swap kalau load-nya berhasil.
+# Load gagal (file lagi ditulis, JSON rusak) -> tree lama tetap dipakai, dicoba lagi di cek berikutnya.
+_vrp_tree = PrefixTree()
+_vrp_watcher = None
+
+async def watch_vrp_file(path):
+    global _vrp_tree
+    loaded_mtime = None
+    while True:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            if mtime != loaded_mtime:
+                old = [_vrp_tree]
+                _vrp_tree, loaded_mtime = await asyncio.to_thread(load_vrp_file, path), mtime
+                # Referensi terakhir tree lama dilepas di thread: dealloc ratusan ribu node juga bikin loop macet
+                await asyncio.to_thread(old.clear)
+        except Exception as e: print(f"vrp file not loaded: {e}")
+        await asyncio.sleep(RPKI_VRP_RELOAD)
+
+def start_vrp_watch(path=RPKI_VRP_FILE):
+    global _vrp_watcher
+    if path and _vrp_watcher is None: _vrp_watcher = asyncio.ensure_future(watch_vrp_file(path))
+    return _vrp_watcher
+
+def get_vrp_tree():
+    # Belum ke-load -> tree kosong, routing pakai ROA dari RIPEstat
+    start_vrp_watch()
+    return _vrp_tree
+
+def covering_vrps(prefix, roas):
+    # ROA dari RIPEstat -> VRP yang prefix-nya membungkus route
+    net = ipaddress.ip_network(prefix, strict=False)
+    vrps = []
+    for roa in roas:
+        try: vrp = make_vrp(roa.get('asn'), roa.get('prefix', prefix), roa.get('max_length'))
+        except: continue
+        vrp_net = ipaddress.ip_network(vrp['prefix'])
+        if vrp_net.version == net.version and net.subnet_of(vrp_net): vrps.append(vrp)
+    return vrps
+
+def validate_origin(prefix, origin, vrps):
+    # RFC 6811: VRP AS0 nggak pernah match; maxLength default = panjang prefix VRP
+    if not vrps: return "not-found", []
+    plen = ipaddress.ip_network(prefix, strict=False).prefixlen
+    same_asn = [v for v in vrps if origin is not None and origin != 0 and v['asn'] == origin]
+    valid = [v for v in same_asn if plen <= v['max_length']]
+    if valid: return "valid", valid
+    if same_asn: return "invalid-length", same_asn
+    return "invalid-asn", vrps
+
+def rpki_origin_summary(prefix, origin, vrps):
+    fmt = lambda v: f"AS{v['asn']} /{v['max_length']}"
+    state, matched = validate_origin(prefix, origin, vrps)
+    if state == "invalid-asn" and all(v['asn'] == 0 for v in vrps): return "INVALID (AS0)", "Terminated (Drop)"
+    if state == "valid": return RPKI_LABELS[state], fmt(matched[0])
+    if state == "invalid-length": return RPKI_LABELS[state], f"AS{origin} > max " + ", ".join(f"/{v['max_length']}" for v in matched)
+    return RPKI_LABELS[state], f"Origin AS{origin} vs ROA: " + ", ".join(fmt(v) for v in vrps[:3])
+
+def rpki_summary(prefix, origins, vrps):
+    # origins: semua origin AS yang ngumumin prefix; tiap pasangan (prefix, origin) divalidasi sendiri
+    if not vrps: return RPKI_LABELS["not-found"], "-"
+    origins = list(dict.fromkeys(origins or ()))
+    if not origins:
+        # Origin nggak ketahuan (BGP gagal) -> cuma bisa laporin ROA yang ada
+        return "UNKNOWN", "ROA: " + ", ".join(f"AS{v['asn']} /{v['max_length']}" for v in vrps[:3])
+    if len(origins) == 1: return rpki_origin_summary(prefix, origins[0], vrps)
+    # MOAS: status & detail per origin, "AS1: VALID | AS2: INVALID (ASN)"
+    results = [(origin, *rpki_origin_summary(prefix, origin, vrps)) for origin in origins]
+    return " | ".join(f"AS{o}: {status}" for o, status, _ in results), " | ".join(f"AS{o}: {detail}" for o, _, detail in results)
 
 # === TASKS ===
-def task_apnic_hierarchy(cidr):
-    def parse_apnic(raw_text):
-        hierarchy_objs = []
-        current_obj = {}
-        for line in raw_text.split('\n'):
-            line = line.strip()
-            if not line or line.startswith('%'):
-                if current_obj:
-                    if 'inetnum' in current_obj or 'inet6num' in current_obj:
-                        current_obj['_range'] = current_obj.get('inetnum', current_obj.get('inet6num'))
-                        hierarchy_objs.append(current_obj)
-                    current_obj = {}
-                continue
-            if ':' in line:
-                key, val = line.split(':', 1)
-                key = key.strip().lower()
-                val = val.strip()
-                if key in current_obj: current_obj[key] += f" | {val}"
-                else: current_obj[key] = val
-        if current_obj and ('inetnum' in current_obj or 'inet6num' in current_obj):
-             current_obj['_range'] = current_obj.get('inetnum', current_obj.get('inet6num'))
-             hierarchy_objs.append(current_obj)
-        return hierarchy_objs
-
-    # 1. Query Data
-    cmd_self = f"-rB {cidr}" 
-    raw_self = query_socket(cmd_self, server=WHOIS_APNIC)
-    cmd_parent = f"-l -rB {cidr}" 
-    raw_parent = query_socket(cmd_parent, server=WHOIS_APNIC)
-    cmd_children = f"-m -rB {cidr}" 
-    raw_children = query_socket(cmd_children, server=WHOIS_APNIC)
-    
-    full_raw = raw_self + "\n" + raw_parent + "\n" + raw_children
-    hierarchy_list = parse_apnic(full_raw)
+# Block gede bisa punya ribuan children; cukup ambil sekian objek pertama, sisa response nggak dibaca
+APNIC_CHILDREN_MAX = int(os.environ.get("APNIC_CHILDREN_MAX", "100"))
+
+async def task_apnic_hierarchy(cidr, include_children=True, shared_hierarchy=None):
+    # 1. Query Data: index lokal (dump APNIC) dulu, live WHOIS cuma fallback
+    local = apnic_index_lookup(cidr, include_children=include_children)
+    children_capped = children_timed_out = False
+    # Member grup ScanPlan: hierarchy diambil dari tree supernet grup (1x -L + 1x -M buat semua member);
+    # shield biar cancel di sini nggak ngebatalin punya member lain. None -> query live sendiri
+    if local is None and shared_hierarchy is not None:
+        with span("scan_group"): tree = await asyncio.shield(shared_hierarchy())
+        if tree is not None: local = hierarchy_from_tree(tree, cidr, include_children=include_children)
+    if local is not None:
+        self_objs, hierarchy_list, children_capped = local
+    else:
+        upstream_limiter("whois:apnic").check()
+        # -L = exact match + semua less-specific dalam 1 query (dulu -rB & -l -rB terpisah).
+        # Query children (-m) cuma kalau memang diminta.
+        cmd_up = f"-rB -L {cidr}"
+        cmd_children = f"-m -rB {cidr}"
+        if include_children:
+            raw_up, raw_children = await asyncio.gather(
+                query_socket(cmd_up, server=WHOIS_APNIC),
+                query_socket(cmd_children, server=WHOIS_APNIC, max_objects=APNIC_CHILDREN_MAX),
+                return_exceptions=True,
+            )
+            # -L timeout = seluruh task timed out; cuma children yang timeout -> parent tetap dilaporin
+            if isinstance(raw_up, BaseException): raise raw_up
+            if isinstance(raw_children, asyncio.TimeoutError): raw_children, children_timed_out = "", True
+            elif isinstance(raw_children, BaseException): raise raw_children
+        else:
+            raw_up, raw_children = await query_socket(cmd_up, server=WHOIS_APNIC), ""
+
+        # Objek paling spesifik dari -L = object milik CIDR ini sendiri
+        chain = sorted(((rng[1], rng[2], obj) for obj in parse_apnic(raw_up) if (rng := parse_range(obj['_range']))), key=lambda e: e[1] - e[0])
+        self_objs = [e[2] for e in chain[:1]]
+        children_objs = parse_apnic(raw_children)
+        children_capped = len(children_objs) >= APNIC_CHILDREN_MAX
+        target = parse_range(cidr)
+        hierarchy_list = [e[2] for e in nearest_ancestors(chain, target[1], target[2])] + children_objs
     
     unique_hierarchy = []
     seen = set()
@@ -136,8 +1707,7 @@ def task_apnic_hierarchy(cidr):
     parent_obj = unique_hierarchy[0] if unique_hierarchy else None
     
     if not parent_obj:
-        temp = parse_apnic(raw_self)
-        parent_obj = temp[0] if temp else None
+        parent_obj = self_objs[0] if self_objs else None
 
     p_net = parent_obj.get('_range', '-') if parent_obj else '-'
     p_name = parent_obj.get('netname', 'Not Found') if parent_obj else 'Not Found'
@@ -153,92 +1723,211 @@ def task_apnic_hierarchy(cidr):
             child_str = f"{obj.get('netname', '?')} ({obj.get('_range')})"
             if c_desc and c_desc != "-": child_str += f" : {c_desc}"
             children_txt.append(child_str)
+    if children_capped: children_txt.append(f"… (first {APNIC_CHILDREN_MAX} sub-allocations only)")
+    if children_timed_out: children_txt.append(TIMED_OUT)
     
-    return {"parent_net": p_net, "parent_name": p_name, "parent_desc": p_desc, "children": " | ".join(children_txt) if children_txt else "-"}
+    result = {"parent_net": p_net, "parent_name": p_name, "parent_desc": p_desc, "children": " | ".join(children_txt) if children_txt else "-"}
+    if children_timed_out: result["_timed_out"] = ["children"]
+    return result
 
 # === TASK 2: ROUTING INTELLIGENCE (BUG FIXED: ISOLATED TRY-EXCEPT) ===
-def task_routing_intelligence(cidr):
+async def task_routing_intelligence(cidr):
     irr_list = []
     rpki_status, rpki_detail, visibility = "UNKNOWN", "-", "Not Seen"
     detected_upstreams = set()
+    origin_asns = []
     
-    # Session biar cepet (Keep-Alive)
-    with requests.Session() as s:
+    upstream_limiter("ripestat").check()
+    # RADB (kalau nggak ada mirror lokal) jalan duluan di background, bareng RIPEstat
+    irr_mirror = get_irr_mirror()
+    radb_task = None if irr_mirror.size else asyncio.ensure_future(query_socket(f"{cidr}", server=WHOIS_RADB))
+
+    # 4 call RIPEstat jalan barengan lewat client global dengan 1 deadline bersama
+    # (rpki-roas di-skip kalau ada VRP lokal). Yang telat dianggap gagal, sisanya tetap dipakai.
+    endpoints = ["bgp-state", "routing-status", "network-info"]
+    vrp_tree = get_vrp_tree()
+    if not vrp_tree.size: endpoints.append("rpki-roas")
+    fetched = await gather_with_deadline({e: ripestat_get(e, cidr) for e in endpoints}, time_left(RIPESTAT_DEADLINE))
+
+    def ripestat_result(endpoint):
+        value = fetched.get(endpoint)
+        if isinstance(value, BaseException): raise value
+        if value is None: raise KeyError(endpoint)
+        return value
+
+    def ripestat_timed_out(endpoint):
+        return isinstance(fetched.get(endpoint), asyncio.TimeoutError)
+    timed_out = []
+    
+    # 1. Cek Visibility & BGP (tiap sumber Try-Except Terpisah, hasil yang ada tetap digabung)
+    peers_seeing, bgp_seen, bgp_origins = 0, False, []
+    try:
+        r_bgp = ripestat_result("bgp-state")
+        bgp_data = r_bgp.get('data', {}).get('bgp_state', [])
+        for route in bgp_data:
+            path = route.get('path', [])
+            if len(path) >= 2: detected_upstreams.add(f"AS{path[-2]}")
+            if path and path[-1] not in bgp_origins: bgp_origins.append(path[-1])
+            peers_seeing += 1
+        bgp_seen = True
+    except Exception as e: count_task_error("routing", "bgp-state", e)
+
+    try:
+        r_stat = ripestat_result("routing-status")
+        data_stat = r_stat.get('data', {})
+        if peers_seeing == 0:
+            v4_p = data_stat.get('visibility', {}).get('v4', {}).get('ris_peers_seeing', 0)
+            v6_p = data_stat.get('visibility', {}).get('v6', {}).get('ris_peers_seeing', 0)
+            peers_seeing = v4_p if v4_p > 0 else v6_p
         
-        # 1. Cek Visibility & BGP (Try-Except Terpisah)
-        try:
-            url_bgp = f"https://stat.ripe.net/data/bgp-state/data.json?resource={cidr}"
-            r_bgp = s.get(url_bgp, timeout=5).json()
-            bgp_data = r_bgp.get('data', {}).get('bgp_state', [])
-            peers_seeing = 0
-            for route in bgp_data:
-                path = route.get('path', [])
-                if len(path) >= 2: detected_upstreams.add(f"AS{path[-2]}")
-                peers_seeing += 1
-            
-            r_stat = s.get(f"https://stat.ripe.net/data/routing-status/data.json?resource={cidr}", timeout=5).json()
-            data_stat = r_stat.get('data', {})
-            if peers_seeing == 0:
-                v4_p = data_stat.get('visibility', {}).get('v4', {}).get('ris_peers_seeing', 0)
-                v6_p = data_stat.get('visibility', {}).get('v6', {}).get('ris_peers_seeing', 0)
-                peers_seeing = v4_p if v4_p > 0 else v6_p
-            
-            # IRR Objects dari response routing-status
-            for item in data_stat.get('route_objects', []): 
-                irr_list.append(f"{item.get('origin')}@{item.get('source')}")
-            
-            r_net = s.get(f"https://stat.ripe.net/data/network-info/data.json?resource={cidr}", timeout=5).json()
-            origin_as = "?"
-            asns = r_net.get('data', {}).get('asns', [])
-            if asns: origin_as = f"AS{asns[0]}"
-            
-            if peers_seeing > 0:
-                if peers_seeing < 10: visibility = f"⚠️ Low Vis. ({peers_seeing} Peers) via {origin_as}"
-                else: visibility = f"✅ Global ({peers_seeing} Peers) via {origin_as}"
-            else: visibility = "❌ Not Announced"
-            
-        except: 
-            # Kalau BGP gagal/timeout, biarin visibility default (Not Seen) tapi LANJUT ke RPKI
-            pass
-
-        # 2. Cek RPKI (Try-Except Terpisah - Biar kalau BGP mati, ini tetep jalan)
+        # IRR Objects dari response routing-status
+        for item in data_stat.get('route_objects', []): 
+            irr_list.append(f"{item.get('origin')}@{item.get('source')}")
+        bgp_seen = True
+    except Exception as e: count_task_error("routing", "routing-status", e)
+
+    origin_as = "?"
+    try:
+        r_net = ripestat_result("network-info")
+        asns = r_net.get('data', {}).get('asns', [])
+        origin_asns = [parse_asn(a) for a in asns]
+    except Exception as e:
+        # network-info telat/gagal -> origin dari AS terakhir di path bgp-state
+        count_task_error("routing", "network-info", e)
+        try: origin_asns = [parse_asn(a) for a in bgp_origins]
+        except Exception: origin_asns = []
+    if origin_asns: origin_as = f"AS{origin_asns[0]}"
+    origin_timed_out = not origin_asns and (ripestat_timed_out("network-info") or ripestat_timed_out("bgp-state"))
+
+    # Kalau BGP gagal/timeout, biarin visibility default (Not Seen) tapi LANJUT ke RPKI
+    if bgp_seen:
+        if peers_seeing > 0:
+            if peers_seeing < 10: visibility = f"⚠️ Low Vis. ({peers_seeing} Peers) via {origin_as}"
+            else: visibility = f"✅ Global ({peers_seeing} Peers) via {origin_as}"
+        else: visibility = "❌ Not Announced"
+    elif ripestat_timed_out("bgp-state") or ripestat_timed_out("routing-status"):
+        visibility = TIMED_OUT
+        timed_out.append("visibility")
+    if not detected_upstreams and ripestat_timed_out("bgp-state"): timed_out.append("upstreams")
+
+    # 2. Cek RPKI (Try-Except Terpisah - Biar kalau BGP mati, ini tetep jalan)
+    # VRP lokal (RPKI_VRP_FILE) kalau ada, kalau nggak pakai ROA dari RIPEstat; validasi tetap RFC 6811
+    try:
+        if vrp_tree.size:
+            vrps = [e[2] for e in vrp_tree.covering(cidr)]
+        else:
+            r_rpki = ripestat_result("rpki-roas")
+            vrps = covering_vrps(cidr, r_rpki.get('data', {}).get('roas', []))
+        rpki_status, rpki_detail = rpki_summary(cidr, origin_asns, vrps)
+        # ROA ada tapi origin nggak sempat didapat -> validasi belum bisa dianggap selesai
+        if origin_timed_out and vrps: timed_out.append("rpki_status")
+    except Exception as e:
+        # Kalau RPKI gagal, status tetep UNKNOWN
+        count_task_error("routing", "rpki", e)
+        if isinstance(e, asyncio.TimeoutError):
+            rpki_detail = "Timed out"
+            timed_out.append("rpki_status")
+
+    # 3. Cek IRR: mirror lokal (IRR_MIRROR_DIR) kalau ada, kalau nggak RADB (Terpisah juga)
+    try:
+        if radb_task is None:
+            for route in irr_mirror.lookup(cidr):
+                obj = f"{route['origin']}@{route['source']}"
+                if obj not in irr_list: irr_list.append(obj)
+            raw_radb = ""
+        else: raw_radb = await radb_task
+        for route in iter_rpsl([raw_radb]):
+            key = IRRMirror.route_key(route)
+            if not key or not key[2]: continue
+            obj = f"{key[1]}@{key[2]}"
+            if obj not in irr_list: irr_list.append(obj)
+    except Exception as e:
+        count_task_error("routing", "irr", e)
+        if isinstance(e, asyncio.TimeoutError): timed_out.append("irr_objects")
+
+    irr_objects = list(set(irr_list)) + ([TIMED_OUT] if "irr_objects" in timed_out else [])
+    result = {"visibility": visibility, "rpki_status": rpki_status, "rpki_detail": rpki_detail, "irr_objects": " | ".join(irr_objects) if irr_objects else "-", "upstreams": ", ".join(list(detected_upstreams)) if detected_upstreams else (TIMED_OUT if "upstreams" in timed_out else "-")}
+    if timed_out: result["_timed_out"] = timed_out
+    return result
+
+# 3. REVERSE DNS
+REVERSE_FANOUT = int(os.environ.get("REVERSE_FANOUT", "16"))
+REVERSE_AGGREGATE_MIN_PLEN = 8
+
+def domain_nservers(obj):
+    # obj = RPSLObject
+    ns_found = []
+    for ns in obj.get('nserver', ()):
+        ns = ns.strip().lower()
+        if ns and ns not in ns_found: ns_found.append(ns)
+    return ns_found
+
+def reverse_zone_subnets(domain):
+    # "2.1.10.in-addr.arpa" -> [10.1.2.0/24]; "2-5.1.10.in-addr.arpa" (range APNIC) -> 10.1.2.0/24 .. 10.1.5.0/24
+    name = domain.strip().lower().rstrip('.')
+    if not name.endswith('.in-addr.arpa'): return []
+    labels = name[:-len('.in-addr.arpa')].split('.')
+    if len(labels) != 3: return []
+    try:
+        lo, _, hi = labels[0].partition('-')
+        lo, hi = int(lo), int(hi or lo)
+        return [ipaddress.ip_network(f"{labels[2]}.{labels[1]}.{third}.0/24") for third in range(lo, hi + 1) if 0 <= third <= 255]
+    except: return []
+
+async def reverse_delegations_v4(net):
+    # 1 query "-M" per /16 pembungkus (bukan 1 query per /24), dijalanin paralel tapi dibatasi.
+    # Kalau query -M gagal total, fallback ke query per /24 (juga paralel). /24 yang kena deadline -> None.
+    # Key = nomor /24 (alamat >> 8), jadi nggak perlu materialisasi set jutaan objek ip_network.
+    sem = asyncio.Semaphore(REVERSE_FANOUT)
+    lo, hi = int(net.network_address) >> 8, int(net.broadcast_address) >> 8
+    delegations = {}
+
+    async def exact_24(idx):
         try:
-            r_rpki = s.get(f"https://stat.ripe.net/data/rpki-roas/data.json?resource={cidr}", timeout=5).json()
-            roas = r_rpki.get('data', {}).get('roas', [])
-            if roas:
-                # Ambil ROA pertama (biasanya yang paling relevan)
-                asn = roas[0].get('asn')
-                maxlen = roas[0].get('max_length')
-                maxlen_str = f"/{maxlen}" if maxlen else ""
-                
-                # Logic AS0
-                if str(asn) == "0": 
-                    rpki_status, rpki_detail = "INVALID (AS0)", "Terminated (Drop)"
-                else: 
-                    rpki_status, rpki_detail = "VALID", f"AS{asn} {maxlen_str}"
-            else: 
-                rpki_status = "NOT FOUND"
-        except: 
-            # Kalau RPKI gagal, status tetep UNKNOWN
-            pass
-
-        # 3. Cek IRR / RADB Tambahan (Terpisah juga)
+            async with sem: raw = await query_socket(f"-rB {idx & 255}.{idx >> 8 & 255}.{idx >> 16}.in-addr.arpa", server=WHOIS_APNIC)
+        except asyncio.TimeoutError:
+            delegations[idx] = None
+            return
+        for obj in iter_rpsl([raw]):
+            if obj.cls == 'domain' and domain_nservers(obj): delegations[idx] = tuple(domain_nservers(obj))
+
+    async def more_specific_16(block):
+        first, last = max(lo, block << 8), min(hi, block << 8 | 255)
         try:
-            raw_radb = query_socket(f"{cidr}", server=WHOIS_RADB)
-            curr_origin, curr_source = None, None
-            for line in raw_radb.split('\n'):
-                line = line.strip()
-                if line.startswith('origin:'): curr_origin = line.split(':')[1].strip().upper()
-                if line.startswith('source:'): curr_source = line.split(':')[1].strip().upper()
-                if curr_origin and curr_source:
-                    obj = f"{curr_origin}@{curr_source}"
-                    if obj not in irr_list: irr_list.append(obj); curr_origin, curr_source = None, None
-        except: pass
+            async with sem: raw = await query_socket(f"-rB -M {block & 255}.{block >> 8}.in-addr.arpa", server=WHOIS_APNIC)
+        except asyncio.TimeoutError:
+            for idx in range(first, last + 1): delegations[idx] = None
+            return
+        if not raw:
+            await asyncio.gather(*(exact_24(idx) for idx in range(first, last + 1)))
+            return
+        for obj in iter_rpsl([raw]):
+            if obj.cls != 'domain': continue
+            ns = tuple(domain_nservers(obj))
+            if not ns: continue
+            for subnet in reverse_zone_subnets(obj.first('domain')):
+                idx = int(subnet.network_address) >> 8
+                if first <= idx <= last: delegations[idx] = ns
 
-    return {"visibility": visibility, "rpki_status": rpki_status, "rpki_detail": rpki_detail, "irr_objects": " | ".join(list(set(irr_list))) if irr_list else "-", "upstreams": ", ".join(list(detected_upstreams)) if detected_upstreams else "-"}
+    await asyncio.gather(*(more_specific_16(block) for block in range(lo >> 8, (hi >> 8) + 1)))
+    return delegations
 
-# 3. REVERSE DNS
-def task_reverse_dns(cidr):
+def delegation_runs(lo, hi, delegations):
+    # /24 berurutan (nomor lo..hi) dengan nameserver sama digabung jadi 1 run [first, last, ns];
+    # cuma jalan di key yang ada, celah di antaranya = () (No Delegation)
+    runs, pos = [], lo
+    def add(first, last, ns):
+        if runs and runs[-1][2] == ns: runs[-1][1] = last
+        else: runs.append([first, last, ns])
+    for idx in sorted(delegations):
+        if idx < lo or idx > hi: continue
+        if idx > pos: add(pos, idx - 1, ())
+        add(idx, idx, delegations[idx])
+        pos = idx + 1
+    if pos <= hi: add(pos, hi, ())
+    return runs
+
+async def task_reverse_dns(cidr, ptr_sweep=False):
     def get_zone_name(cidr_obj):
         try:
             if cidr_obj.version == 4:
@@ -252,95 +1941,473 @@ def task_reverse_dns(cidr):
                 return ".".join(rev.split('.')[-(nibbles+2):])
         except: return None
     final_ptr_display = ""
+    ptr_coverage = ""
+    timed_out = False
     try:
         net = ipaddress.ip_network(cidr, strict=False)
-        if net.version == 4 and net.prefixlen < 24:
+        if net.version == 4 and net.prefixlen < REVERSE_AGGREGATE_MIN_PLEN:
+            # /0../7 = puluhan ribu query -M ke APNIC per scan, nggak dicek
+            final_ptr_display = f"Aggregate Block too large for /24 delegation check (max /{REVERSE_AGGREGATE_MIN_PLEN})"
+        elif net.version == 4 and net.prefixlen < 24:
             results = ["Detected Aggregate Block (Checking /24 Delegation):"]
-            for subnet in net.subnets(new_prefix=24):
-                z = get_zone_name(subnet)
-                if z:
-                    raw = query_socket(f"-rB {z}", server=WHOIS_APNIC)
-                    ns_found = []
-                    for line in raw.split('\n'):
-                        if 'nserver:' in line.lower():
-                            ns = line.split(':')[1].strip().lower()
-                            if ns not in ns_found: ns_found.append(ns)
-                    if ns_found: results.append(f" ↳ {subnet}: {', '.join(ns_found[:2])} (APNIC)")
-                    else: results.append(f" ↳ {subnet}: No Delegation")
+            delegations = await reverse_delegations_v4(net)
+            for first, last, ns in delegation_runs(int(net.network_address) >> 8, int(net.broadcast_address) >> 8, delegations):
+                start, end = ipaddress.IPv4Address(first << 8), ipaddress.IPv4Address(last << 8 | 255)
+                blocks = list(ipaddress.summarize_address_range(start, end))
+                label = str(blocks[0]) if len(blocks) == 1 else f"{start} - {end} ({last - first + 1}x /24)"
+                if ns is None:
+                    results.append(f" ↳ {label}: {TIMED_OUT}")
+                    timed_out = True
+                elif ns: results.append(f" ↳ {label}: {', '.join(ns[:2])} (APNIC)")
+                else: results.append(f" ↳ {label}: No Delegation")
             final_ptr_display = "\n".join(results)
         else:
             dns_ptr = "No DNS PTR"
-            try:
-                rev = dns.reversename.from_address(str(net.network_address))
-                resolver = dns.resolver.Resolver()
-                resolver.nameservers = ['8.8.8.8']
-                dns_ptr = str(resolver.resolve(rev, "PTR")[0])
-            except: pass
+            try: dns_ptr = (await resolve_ptr(str(net.network_address))) or dns_ptr
+            except Exception as e:
+                count_task_error("reverse_dns", "ptr", e)
+                timed_out = isinstance(e, asyncio.TimeoutError)
             whois_ns = ""
             z = get_zone_name(net)
             if z:
-                raw = query_socket(f"-rB {z}", server=WHOIS_APNIC)
+                try: raw = await query_socket(f"-rB {z}", server=WHOIS_APNIC)
+                except asyncio.TimeoutError: raw, timed_out = "", True
+                except UpstreamUnavailable:
+                    # APNIC di-skip: kalau PTR live ada tetap dipakai, kalau nggak task = UNKNOWN (bukan "No Delegation")
+                    if "No DNS" in dns_ptr: raise
+                    raw = ""
                 ns_found = []
-                for line in raw.split('\n'):
-                    if 'nserver:' in line.lower():
-                        ns = line.split(':')[1].strip().lower()
+                for obj in iter_rpsl([raw]):
+                    for ns in domain_nservers(obj):
                         if ns not in ns_found: ns_found.append(ns)
                 if ns_found: whois_ns = f"Delegated to: {', '.join(ns_found[:2])}"
             if "No DNS" not in dns_ptr: final_ptr_display = f"{dns_ptr} (Live DNS)"
             elif whois_ns: final_ptr_display = f"{whois_ns} (APNIC Whois)"
+            elif timed_out: final_ptr_display = TIMED_OUT
             else: final_ptr_display = "No Reverse DNS & No Delegation"
-    except Exception as e: final_ptr_display = f"Error: {str(e)}"
-    return {"ptr_record": final_ptr_display}
+            # Sweep semua host di prefix kecil (<= 256 alamat) buat cek coverage PTR
+            if ptr_sweep and net.num_addresses <= PTR_SWEEP_MAX_HOSTS:
+                hosts = list(net.hosts()) or [net.network_address]
+                ptrs = await resolve_ptrs(hosts)
+                found = sum(1 for v in ptrs.values() if v)
+                failed = sum(1 for v in ptrs.values() if v is None)
+                ptr_coverage = f"{found}/{len(hosts)} hosts with PTR" + (f" ({failed} lookup failed)" if failed else "")
+    except (asyncio.TimeoutError, UpstreamUnavailable): raise
+    except Exception as e:
+        count_task_error("reverse_dns", "delegation", e)
+        final_ptr_display = f"Error: {str(e)}"
+    result = {"ptr_record": final_ptr_display}
+    if ptr_coverage: result["ptr_coverage"] = ptr_coverage
+    if timed_out: result["_timed_out"] = ["ptr_record"]
+    return result
 
 # === CONTROLLER ===
-def scan_ip_logic_parallel(cidr_str):
-    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-        future_apnic = executor.submit(task_apnic_hierarchy, cidr_str)
-        future_routing = executor.submit(task_routing_intelligence, cidr_str)
-        future_reverse = executor.submit(task_reverse_dns, cidr_str)
-        try: res_apnic = future_apnic.result()
-        except: res_apnic = {}
-        try: res_routing = future_routing.result()
-        except: res_routing = {}
-        try: res_reverse = future_reverse.result()
-        except: res_reverse = {}
-    return { "cidr": cidr_str, **res_apnic, **res_routing, **res_reverse }
+# Task yang lewat deadline diganti placeholder ini + dicatat di "timed_out" (hasil parsial, bukan nunggu)
+TIMEOUT_PLACEHOLDERS = {
+    "apnic_hierarchy": {"parent_net": "-", "parent_name": TIMED_OUT, "parent_desc": "-", "children": "-"},
+    "routing": {"visibility": TIMED_OUT, "rpki_status": "UNKNOWN", "rpki_detail": "Timed out", "irr_objects": "-", "upstreams": "-"},
+    "reverse_dns": {"ptr_record": TIMED_OUT},
+}
+
+# Sumber yang circuit-nya lagi kebuka -> langsung UNKNOWN tanpa nanya upstream
+UNAVAILABLE_PLACEHOLDERS = {
+    key: {field: ("UNKNOWN" if value == TIMED_OUT else value) for field, value in fields.items()}
+    for key, fields in TIMEOUT_PLACEHOLDERS.items()
+}
+UNAVAILABLE_PLACEHOLDERS["routing"]["rpki_detail"] = "Source unavailable"
+
+def timed_out_result(cidr_str, keys=tuple(TIMEOUT_PLACEHOLDERS)):
+    merged = {"cidr": cidr_str}
+    for key in keys: merged.update(TIMEOUT_PLACEHOLDERS[key])
+    merged["timed_out"] = list(keys)
+    return merged
+
+async def timed_task(name, coro):
+    start = asyncio.get_running_loop().time()
+    try:
+        with span(name): return await coro
+    except asyncio.CancelledError: raise
+    except Exception as e:
+        count_task_error(name, "task", e)
+        raise
+    finally: metrics.observe("resource_validator_task_seconds", asyncio.get_running_loop().time() - start, task=name)
+
+async def scan_ip_logic_parallel(cidr_str, ptr_sweep=False, include_children=True, deadline=None, trace=False, shared_hierarchy=None):
+    if deadline is not None: scan_deadline.set(deadline)
+    budget = time_left()
+    started = asyncio.get_running_loop().time()
+    root = Span(cidr_str) if trace else None
+    current_span.set(root)
+    # Grace kecil biar timeout di dalam task kebakar duluan dan task sempat balikin hasil parsialnya sendiri
+    results = await gather_with_deadline({
+        "apnic_hierarchy": timed_task("apnic_hierarchy", task_apnic_hierarchy(cidr_str, include_children=include_children, shared_hierarchy=shared_hierarchy)),
+        "routing": timed_task("routing", task_routing_intelligence(cidr_str)),
+        "reverse_dns": timed_task("reverse_dns", task_reverse_dns(cidr_str, ptr_sweep=ptr_sweep)),
+    }, None if budget is None else budget + SCAN_GRACE)
+    merged, timed_out, unavailable = {"cidr": cidr_str}, [], []
+    for key, res in results.items():
+        if isinstance(res, asyncio.TimeoutError):
+            metrics.inc("resource_validator_task_timeouts_total", task=key)
+            timed_out.append(key)
+            res = TIMEOUT_PLACEHOLDERS[key]
+        elif isinstance(res, UpstreamUnavailable):
+            unavailable.append(key)
+            res = UNAVAILABLE_PLACEHOLDERS[key]
+        elif isinstance(res, BaseException): res = {}
+        else:
+            # Task selesai tapi sebagian field-nya kena deadline (nilainya TIMED_OUT)
+            res = dict(res)
+            if res.pop("_timed_out", None):
+                metrics.inc("resource_validator_task_timeouts_total", task=key)
+                timed_out.append(key)
+        merged.update(res)
+    if timed_out: merged["timed_out"] = timed_out
+    if unavailable: merged["unavailable"] = unavailable
+    metrics.observe("resource_validator_scan_seconds", asyncio.get_running_loop().time() - started)
+    if root is not None:
+        root.end = asyncio.get_running_loop().time()
+        root.outcome = "partial" if timed_out or unavailable else "ok"
+        merged["trace"] = root.to_dict()
+    return merged
+
+async def scan_ip_limited(cidr_str, deadline=None, owner=None, **options):
+    async with scan_limiter.slot(owner):
+        # Budget request udah habis selama ngantri -> jangan mulai query baru
+        if deadline is not None and deadline <= asyncio.get_running_loop().time(): return timed_out_result(cidr_str)
+        return await scan_ip_logic_parallel(cidr_str, deadline=deadline, **options)
 
 # === API ===
 class InputData(BaseModel):
     raw_text: str
+    ptr_sweep: bool = False
+    include_children: bool = True
+    budget: Optional[float] = None
+
+def scan_budget(payload):
+    # Detik; default SCAN_BUDGET, dibatasi SCAN_BUDGET_MAX (limit function Vercel)
+    # SCAN_BUDGET_MIN biar client nggak bisa minta budget yang pasti habis sebelum upstream sempat jawab
+    budget = payload.budget if payload.budget and payload.budget > 0 else SCAN_BUDGET
+    return max(SCAN_BUDGET_MIN, min(budget, SCAN_BUDGET_MAX))
 
-def convert_range_to_cidr(teks_input):
+def scan_options(payload):
+    return {"ptr_sweep": payload.ptr_sweep, "include_children": payload.include_children}
+
+def parse_scan_input(raw_text, max_lines=50):
+    raw_lines = raw_text.split('\n')
+    if len(raw_lines) > max_lines: raise HTTPException(status_code=400, detail="Too many IPs.")
+    valid_cidrs = []
+    for line in raw_lines:
+        parsed = parse_target(line)
+        if not parsed: continue
+        kind, value = parsed
+        if kind == "range": valid_cidrs.extend(value)
+        elif kind != "asn": valid_cidrs.append(value)
+    return valid_cidrs
+
+def parse_scan_strings(raw_text, max_lines):
+    # Versi bulk parse_scan_input buat job / import portfolio: semua baris di-parse & range didekomposisi
+    # sekaligus lewat PrefixBatch, output langsung string CIDR (urutan input)
+    raw_lines = raw_text.split('\n')
+    if len(raw_lines) > max_lines: raise HTTPException(status_code=400, detail="Too many IPs.")
+    # Sintaks tetap lewat TARGET_RE yang sama dengan parse_target (ASN & format aneh dibuang); nilai oktet,
+    # range kebalik / beda versi ditolak parse_range -> baris invalid
+    rows = [line for line in raw_lines if len(line) <= MAX_INPUT_LEN and (m := TARGET_RE.match(line)) and m.group(10) is None]
+    return PrefixBatch.from_strings(rows).cidr_strings()
+
+# === SCAN PLANNER ===
+# Pre-pass input sebelum scan: CIDR identik cuma di-scan sekali lalu hasilnya di-fan-out lagi ke tiap baris,
+# dan target yang berdekatan (range yang dipecah jadi banyak CIDR, /25 & /32 di dalam /24, dst) digrup per
+# supernet terkecil yang nutupin semuanya: hierarchy APNIC grup cukup 1x "-rB -L" + 1x "-rB -M" buat supernet itu,
+# tiap member ambil bagiannya sendiri dari situ. Routing & reverse DNS tetap per target (visibility/RPKI memang per prefix).
+# Supernet maksimal segini lebarnya: -M blok yang lebih lebar hampir pasti kepotong SCAN_GROUP_OBJECTS_MAX
+SCAN_GROUP_MIN_PLEN = {4: 22, 6: 48}
+# -M lebih dari segini objek -> grup dilepas, tiap member query live sendiri
+SCAN_GROUP_OBJECTS_MAX = int(os.environ.get("SCAN_GROUP_OBJECTS_MAX", "500"))
+
+class ScanPlan:
+    def __init__(self, cidrs):
+        self.lines = [str(c) for c in cidrs]
+        self.targets = list(dict.fromkeys(self.lines))
+        self.indices = collections.defaultdict(list)
+        for i, line in enumerate(self.lines): self.indices[line].append(i)
+        # Urut start, yang lebih lebar duluan
+        ranked = sorted(((rng, t) for t in self.targets if (rng := parse_range(t))), key=lambda item: (item[0][0], item[0][1], -item[0][2]))
+        groups = []
+        for (version, start, end), target in ranked:
+            group = groups[-1] if groups else None
+            if group and group[0] == version:
+                hi = max(group[2], end)
+                if PrefixTree.WIDTH[version] - (group[1] ^ hi).bit_length() >= SCAN_GROUP_MIN_PLEN[version]:
+                    group[2] = hi
+                    group[3].append(target)
+                    continue
+            groups.append([version, start, end, [target]])
+        self.group_of = {}
+        for version, lo, hi, members in groups:
+            if len(members) < 2: continue
+            _, _, _, prefix, plen = PrefixTree.key((version, lo, hi))
+            supernet = str(ipaddress.IPv4Network((prefix, plen)) if version == 4 else ipaddress.IPv6Network((prefix, plen)))
+            for target in members: self.group_of[target] = supernet
+
+async def group_hierarchy(supernet):
+    # PrefixTree semua objek APNIC yang nutupin / ada di dalam supernet grup. None (kepotong / kosong) -> member query live.
+    # Timeout & circuit open tetap dilempar: member ngalamin hal yang sama kalau query sendiri
+    upstream_limiter("whois:apnic").check()
+    raw_up, raw_more = await asyncio.gather(
+        query_socket(f"-rB -L {supernet}", server=WHOIS_APNIC),
+        query_socket(f"-rB -M {supernet}", server=WHOIS_APNIC, max_objects=SCAN_GROUP_OBJECTS_MAX),
+    )
+    more_objs = parse_apnic(raw_more)
+    if not raw_up or len(more_objs) >= SCAN_GROUP_OBJECTS_MAX: return None
+    tree, seen = PrefixTree(), set()
+    for obj in parse_apnic(raw_up) + more_objs:
+        # Objek exact supernet bisa muncul di -L & -M
+        key = (obj['_range'], obj.get('source', ''))
+        rng = parse_range(obj['_range'])
+        if key in seen or not rng: continue
+        seen.add(key)
+        tree.insert(rng, obj)
+    return tree
+
+async def run_scan_plan(plan, deadline, **options):
+    # Async generator: (target, hasil / exception) begitu tiap target selesai. 1 plan = 1 owner di scan_limiter
+    groups = {}
+    owner = object()
+
+    def group_tree(supernet, target):
+        # Baru di-query pas member pertama butuh (index lokal kena -> nggak pernah ke WHOIS). Task-nya nyalin
+        # context member itu, jadi span WHOIS grup nempel di trace member pemicu; member lain dapat referensinya.
+        sp = current_span.get()
+        if supernet not in groups: groups[supernet] = asyncio.ensure_future(group_hierarchy(supernet)), target
+        elif sp is not None: sp.attrs["shared_from"] = groups[supernet][1]
+        if sp is not None: sp.attrs["supernet"] = supernet
+        return groups[supernet][0]
+
+    async def run(target):
+        opts = dict(options)
+        supernet = plan.group_of.get(target)
+        if supernet is not None: opts["shared_hierarchy"] = functools.partial(group_tree, supernet, target)
+        try: return target, await scan_ip_limited(target, deadline=deadline, owner=owner, **opts)
+        except Exception as e: return target, e
+
+    tasks = [asyncio.ensure_future(run(t)) for t in plan.targets]
     try:
-        parts = teks_input.split('-')
-        if len(parts) != 2: return []
-        start = ipaddress.ip_address(parts[0].strip())
-        end = ipaddress.ip_address(parts[1].strip())
-        return list(ipaddress.summarize_address_range(start, end))
-    except: return []
+        for next_done in asyncio.as_completed(tasks): yield await next_done
+    finally:
+        for t in tasks + [g[0] for g in groups.values()]: t.cancel()
 
 @app.post("/api/scan")
 @app.post("/scan")
-async def scan_endpoint(payload: InputData):
-    raw_lines = payload.raw_text.split('\n')
-    if len(raw_lines) > 50: raise HTTPException(status_code=400, detail="Too many IPs.")
-    valid_cidrs = []
-    for line in raw_lines:
-        line = line.strip()
-        if not line: continue
-        if not is_safe_input(line, type="IP"): continue
-        if "-" in line and ":" not in line: valid_cidrs.extend(convert_range_to_cidr(line))
-        else:
-            try: valid_cidrs.append(ipaddress.ip_network(line, strict=False))
-            except: continue
-    results = []
-    for cidr in valid_cidrs:
-        try:
-            data = scan_ip_logic_parallel(str(cidr))
-            results.append(data)
-            time.sleep(0.5) 
-        except Exception as e: print(e)
-    return results
+async def scan_endpoint(payload: InputData, trace: bool = False):
+    plan = ScanPlan(parse_scan_input(payload.raw_text))
+    options = scan_options(payload)
+    # ?trace=1 -> tiap hasil CIDR dapat "trace" (span tree WHOIS/RIPEstat/DNS)
+    if trace: options["trace"] = True
+    deadline = deadline_in(scan_budget(payload))
+    results = [None] * len(plan.lines)
+    async for target, data in run_scan_plan(plan, deadline, **options):
+        if isinstance(data, BaseException): print(data); continue
+        for i in plan.indices[target]: results[i] = data
+    return [data for data in results if data is not None]
+
+# Versi streaming: tiap CIDR langsung dikirim begitu 3 task-nya selesai (NDJSON, 1 event per baris)
+#   {"type": "start", "total": N}
+#   {"type": "result", "index": i, "done": k, "total": N, "data": {...}}
+#   {"type": "error", "index": i, "done": k, "total": N, "cidr": "..."}
+#   {"type": "done", "total": N}
+async def scan_event_stream(valid_cidrs, options, budget):
+    plan = ScanPlan(valid_cidrs)
+    total = len(plan.lines)
+    yield json.dumps({"type": "start", "total": total}) + "\n"
+
+    scans = run_scan_plan(plan, deadline_in(budget), **options)
+    try:
+        done = 0
+        async for cidr, data in scans:
+            if isinstance(data, Exception): print(data)
+            # 1 target bisa mewakili beberapa baris input (duplikat) -> event per baris
+            for index in plan.indices[cidr]:
+                done += 1
+                if isinstance(data, Exception):
+                    yield json.dumps({"type": "error", "index": index, "done": done, "total": total, "cidr": cidr}) + "\n"
+                else:
+                    yield json.dumps({"type": "result", "index": index, "done": done, "total": total, "data": data}) + "\n"
+        yield json.dumps({"type": "done", "total": total}) + "\n"
+    finally:
+        # Client putus di tengah jalan -> jangan terusin scan yang nggak ada yang nunggu
+        await scans.aclose()
+
+@app.post("/api/scan/stream")
+@app.post("/scan/stream")
+async def scan_stream_endpoint(payload: InputData, trace: bool = False):
+    valid_cidrs = parse_scan_input(payload.raw_text)
+    options = scan_options(payload)
+    if trace: options["trace"] = True
+    return StreamingResponse(scan_event_stream(valid_cidrs, options, scan_budget(payload)), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# === METRICS ENDPOINT ===
+@app.get("/api/metrics")
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# === BULK JOBS ===
+# Buat audit portfolio (ribuan prefix): submit -> job id, dikerjain worker pool di background,
+# progress & hasil disimpan di SQLite biar job bisa di-resume setelah restart.
+JOB_DB = os.environ.get("JOB_DB", "/tmp/resource_validator_jobs.db")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "8"))
+JOB_MAX_LINES = int(os.environ.get("JOB_MAX_LINES", "20000"))
+JOB_PAGE_LIMIT = 500
+# Lease per job: cuma 1 proses (owner) yang boleh ngerjain job, diperpanjang tiap JOB_LEASE/3 detik.
+# Proses mati -> lease kadaluarsa -> job diambil alih resume_jobs / status poll di proses lain.
+JOB_LEASE = float(os.environ.get("JOB_LEASE", "60"))
+JOB_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class JobStore:
+    def __init__(self, path):
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, created REAL, status TEXT, total INTEGER)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS job_items (job_id TEXT, idx INTEGER, cidr TEXT, status TEXT, result TEXT, PRIMARY KEY (job_id, idx))")
+        # DB lama belum punya kolom options
+        for column in ("options TEXT", "lease_owner TEXT", "lease_until REAL"):
+            try: self.db.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+            except sqlite3.OperationalError: pass
+
+    def create(self, cidrs, options=None):
+        job_id = uuid.uuid4().hex
+        with self.db:
+            self.db.execute("BEGIN")
+            self.db.execute("INSERT INTO jobs (id, created, status, total, options) VALUES (?, ?, 'queued', ?, ?)", (job_id, time.time(), len(cidrs), json.dumps(options or {})))
+            self.db.executemany("INSERT INTO job_items (job_id, idx, cidr, status) VALUES (?, ?, ?, 'pending')", [(job_id, i, c) for i, c in enumerate(cidrs)])
+        return job_id
+
+    def get(self, job_id):
+        row = self.db.execute("SELECT id, created, status, total FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if not row: return None
+        counts = dict(self.db.execute("SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)).fetchall())
+        return {"job_id": row[0], "created": row[1], "status": row[2], "total": row[3], "done": counts.get("done", 0), "errors": counts.get("error", 0), "pending": counts.get("pending", 0)}
+
+    def options(self, job_id):
+        row = self.db.execute("SELECT options FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else {}
+
+    def set_status(self, job_id, status):
+        self.db.execute("UPDATE jobs SET status = ? WHERE id = ?", (status, job_id))
+
+    def pending_items(self, job_id):
+        return self.db.execute("SELECT idx, cidr FROM job_items WHERE job_id = ? AND status = 'pending' ORDER BY idx", (job_id,)).fetchall()
+
+    def save_result(self, job_id, idx, status, result):
+        self.db.execute("UPDATE job_items SET status = ?, result = ? WHERE job_id = ? AND idx = ?", (status, json.dumps(result), job_id, idx))
+
+    def results(self, job_id, after, limit):
+        # Cursor = idx terakhir yang udah diterima client. Berhenti di item pending pertama, jadi item yang
+        # selesai belakangan nggak kelewat & halaman nggak geser waktu job masih jalan.
+        rows = self.db.execute("SELECT idx, cidr, status, result FROM job_items WHERE job_id = ? AND idx > ? ORDER BY idx LIMIT ?", (job_id, after, limit)).fetchall()
+        results = []
+        for idx, cidr, status, result in rows:
+            if status == 'pending': break
+            results.append({"index": idx, "cidr": cidr, "status": status, "data": json.loads(result) if result else None})
+        return results
+
+    def claim(self, job_id, owner):
+        # Atomic: berhasil kalau belum ada owner, owner-nya kita sendiri, atau lease-nya udah kadaluarsa
+        now = time.time()
+        cur = self.db.execute(
+            "UPDATE jobs SET lease_owner = ?, lease_until = ? WHERE id = ? AND status IN ('queued', 'running') "
+            "AND (lease_owner IS NULL OR lease_owner = ? OR lease_until < ?)", (owner, now + JOB_LEASE, job_id, owner, now))
+        return cur.rowcount == 1
+
+    def renew(self, job_id, owner):
+        cur = self.db.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND lease_owner = ?", (time.time() + JOB_LEASE, job_id, owner))
+        return cur.rowcount == 1
+
+    def release(self, job_id, owner):
+        self.db.execute("UPDATE jobs SET lease_owner = NULL, lease_until = NULL WHERE id = ? AND lease_owner = ?", (job_id, owner))
+
+    def unfinished_jobs(self):
+        return [r[0] for r in self.db.execute("SELECT id FROM jobs WHERE status IN ('queued', 'running')").fetchall()]
+
+_job_store = None
+_job_runners = {}
+_job_slots = asyncio.Semaphore(max(1, JOB_WORKERS))
+
+def get_job_store():
+    global _job_store
+    if _job_store is None: _job_store = JobStore(JOB_DB)
+    return _job_store
+
+async def run_job(job_id):
+    store = get_job_store()
+    store.set_status(job_id, "running")
+    queue = collections.deque(store.pending_items(job_id))
+    options = store.options(job_id)
+
+    async def worker():
+        while queue:
+            idx, cidr = queue.popleft()
+            async with _job_slots:
+                try: store.save_result(job_id, idx, "done", await scan_ip_logic_parallel(cidr, deadline=deadline_in(JOB_CIDR_BUDGET), **options))
+                except Exception as e: store.save_result(job_id, idx, "error", {"cidr": cidr, "error": str(e)})
+
+    work = asyncio.ensure_future(asyncio.gather(*(worker() for _ in range(min(JOB_WORKERS, len(queue)) or 1))))
+    work.add_done_callback(lambda f: f.cancelled() or f.exception())  # hasil cancel waktu lease hilang nggak perlu di-log
+    try:
+        while not work.done():
+            await asyncio.wait([work], timeout=JOB_LEASE / 3)
+            if not work.done() and not store.renew(job_id, JOB_OWNER):
+                # Lease udah diambil proses lain (proses ini sempet macet) -> berhenti, jangan dikerjain dobel
+                print(f"job {job_id}: lease lost")
+                return
+        await work
+        store.set_status(job_id, "done")
+    finally:
+        # Cancel/shutdown: item yang lagi jalan tetap 'pending' di DB, lease dilepas biar langsung bisa di-resume
+        work.cancel()
+        store.release(job_id, JOB_OWNER)
+        _job_runners.pop(job_id, None)
+
+def start_job(job_id):
+    if job_id in _job_runners: return
+    if not get_job_store().claim(job_id, JOB_OWNER): return
+    _job_runners[job_id] = asyncio.ensure_future(run_job(job_id))
+
+async def resume_jobs():
+    try:
+        for job_id in get_job_store().unfinished_jobs(): start_job(job_id)
+    except Exception as e: print(f"job resume failed: {e}")
+
+@app.post("/api/jobs")
+@app.post("/jobs")
+async def job_submit_endpoint(payload: InputData):
+    valid_cidrs = parse_scan_strings(payload.raw_text, max_lines=JOB_MAX_LINES)
+    if not valid_cidrs: raise HTTPException(status_code=400, detail="No valid IPs.")
+    store = get_job_store()
+    job_id = store.create(valid_cidrs, scan_options(payload))
+    start_job(job_id)
+    return store.get(job_id)
+
+@app.get("/api/jobs/{job_id}")
+@app.get("/jobs/{job_id}")
+async def job_status_endpoint(job_id: str):
+    job = get_job_store().get(job_id)
+    if not job: raise HTTPException(status_code=404, detail="Job not found.")
+    # Worker mati (restart/cold start) -> lanjutin dari CIDR terakhir yang belum selesai
+    if job["status"] in ("queued", "running"): start_job(job_id)
+    return job
+
+@app.get("/api/jobs/{job_id}/results")
+@app.get("/jobs/{job_id}/results")
+async def job_results_endpoint(job_id: str, after: int = -1, limit: int = 100):
+    store = get_job_store()
+    job = store.get(job_id)
+    if not job: raise HTTPException(status_code=404, detail="Job not found.")
+    limit = max(1, min(limit, JOB_PAGE_LIMIT))
+    after = max(-1, after)
+    results = store.results(job_id, after, limit)
+    # Halaman berikutnya: ?after=next_after (sama dengan after kalau belum ada item baru yang selesai)
+    return {**job, "after": after, "limit": limit, "next_after": results[-1]["index"] if results else after, "results": results}
 
 class ASNInput(BaseModel):
     asn: str
@@ -356,31 +2423,45 @@ async def asn_endpoint(payload: ASNInput):
     prefixes_v4 = []
     prefixes_v6 = []
     upstreams = []
-    with requests.Session() as s:
-        try:
-            url_overview = f"https://stat.ripe.net/data/as-overview/data.json?resource={asn_str}"
-            resp = s.get(url_overview, timeout=5)
-            if resp.status_code == 200: holder_name = resp.json().get('data', {}).get('holder', asn_str)
-        except: pass
-        try:
-            url_prefix = f"https://stat.ripe.net/data/announced-prefixes/data.json?resource={asn_str}"
-            resp = s.get(url_prefix, timeout=8)
-            if resp.status_code == 200:
-                prefix_data = resp.json().get('data', {}).get('prefixes', [])
-                seen = set()
-                for item in prefix_data:
-                    p = item.get('prefix')
-                    if p not in seen:
-                        seen.add(p)
-                        if ":" in p: prefixes_v6.append(p)
-                        else: prefixes_v4.append(p)
-        except: pass
-        try:
-            url_neigh = f"https://stat.ripe.net/data/asn-neighbours/data.json?resource={asn_str}"
-            resp = s.get(url_neigh, timeout=6)
-            if resp.status_code == 200:
-                neigh_data = resp.json().get('data', {}).get('neighbours', [])
-                for n in neigh_data:
-                    if len(upstreams) < 15: upstreams.append(f"AS{n.get('asn')}")
-        except: pass
-    return {"asn": asn_str, "holder": holder_name, "total_v4": len(prefixes_v4), "total_v6": len(prefixes_v6), "prefixes_v4": prefixes_v4, "prefixes_v6": prefixes_v6, "upstreams": upstreams}
\ No newline at end of file
+    overview, announced, neighbours = await asyncio.gather(
+        ripestat_get("as-overview", asn_str, timeout=5),
+        ripestat_get("announced-prefixes", asn_str, timeout=8),
+        ripestat_get("asn-neighbours", asn_str, timeout=6),
+        return_exceptions=True,
+    )
+    try:
+        if isinstance(overview, BaseException): raise overview
+        holder_name = overview.get('data', {}).get('holder', asn_str)
+    except: pass
+    try:
+        if isinstance(announced, BaseException): raise announced
+        prefix_data = announced.get('data', {}).get('prefixes', [])
+        seen = set()
+        for item in prefix_data:
+            p = item.get('prefix')
+            if p not in seen:
+                seen.add(p)
+                if ":" in p: prefixes_v6.append(p)
+                else: prefixes_v4.append(p)
+    except: pass
+    try:
+        if isinstance(neighbours, BaseException): raise neighbours
+        neigh_data = neighbours.get('data', {}).get('neighbours', [])
+        for n in neigh_data:
+            if len(upstreams) < 15: upstreams.append(f"AS{n.get('asn')}")
+    except: pass
+    return {"asn": asn_str, "holder": holder_name, "total_v4": len(prefixes_v4), "total_v6": len(prefixes_v6), "prefixes_v4": prefixes_v4, "prefixes_v6": prefixes_v6, "upstreams": upstreams}
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Resource validator offline tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_apnic = sub.add_parser("import-apnic", help="Build local APNIC inetnum/inet6num index from split DB dumps")
+    p_apnic.add_argument("dumps", nargs="+")
+    p_apnic.add_argument("-o", "--output", default="apnic-index.pickle")
+    args = parser.parse_args()
+    if args.command == "import-apnic":
+        started = time.time()
+        snapshot = build_apnic_snapshot(args.dumps)
+        with open(args.output, 'wb') as f: pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        print(f"{len(snapshot[4])} inetnum + {len(snapshot[6])} inet6num -> {args.output} ({time.time() - started:.1f}s)")
@@ -95,13 +95,33 @@ export default function Home() {
     e.target.value = "";
   };
 
+  // Disamain sama parse_target di api/index.py (TARGET_RE): oktet tanpa leading zero & <= 255, range nggak kebalik,
+  // IPv6 (termasuk compressed "2001:db8::1:2", "::1") divalidasi parser URL bawaan browser, bukan regex.
+  const parseV4 = (text: string) => {
+    const m = /^(0|[1-9]\d{0,2})\.(0|[1-9]\d{0,2})\.(0|[1-9]\d{0,2})\.(0|[1-9]\d{0,2})$/.exec(text);
+    if (!m) return null;
+    const octets = m.slice(1).map(Number);
+    return octets.every((o) => o <= 255) ? octets.reduce((acc, o) => acc * 256 + o, 0) : null;
+  };
+
+  const isIPv6 = (text: string) => {
+    if (!/^[0-9A-Fa-f.]*:[0-9A-Fa-f:.]*$/.test(text)) return false;
+    try { new URL(`http://[${text}]/`); return true; } catch { return false; }
+  };
+
   const validateInput = (text: string, type: "IP" | "ASN") => {
+    if (text.length > 50) return false;
     const cleanText = text.trim();
-    if (type === "ASN") return /^AS\d+$/i.test(cleanText);
-    const ipv4Regex = /^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)(?:\/(?:3[0-2]|[1-2]?[0-9]))?$/;
-    const ipv6Regex = /^([0-9a-fA-F]{1,4}:){1,7}:?([0-9a-fA-F]{1,4})?(\/[0-9]{1,3})?$/;
-    const rangeRegex = /^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\s*-\s*\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$/;
-    return ipv4Regex.test(cleanText) || ipv6Regex.test(cleanText) || rangeRegex.test(cleanText);
+    if (type === "ASN") return /^AS\d{1,10}$/i.test(cleanText);
+    const range = /^(\S+?)\s*-\s*(\S+)$/.exec(cleanText);
+    if (range) {
+      const start = parseV4(range[1]), end = parseV4(range[2]);
+      return start !== null && end !== null && start <= end;
+    }
+    const [addr, plen, ...rest] = cleanText.split("/");
+    if (rest.length || (plen !== undefined && !/^\d{1,3}$/.test(plen))) return false;
+    if (parseV4(addr) !== null) return plen === undefined || (plen.length <= 2 && Number(plen) <= 32);
+    return isIPv6(addr) && (plen === undefined || Number(plen) <= 128);
   };
 
   const handleScanIP = async (targets: string) => {
@@ -133,22 +153,40 @@ export default function Home() {
         setShowASNModal(false);
     }
 
-    let accumulatedResults: ScanResult[] = [];
-    for (let i = 0; i < lines.length; i++) {
-        const line = lines[i];
-        try {
-            const res = await fetch("/api/scan", {
-                method: "POST",
-                headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({ raw_text: line }),
-            });
-            const data = await res.json();
-            if (data.error) { console.error("Backend Error:", data.error); continue; }
-            accumulatedResults = [...accumulatedResults, ...data];
-        } catch (error) { console.error(error); }
-        setProgress(i + 1);
-    }
-    
+    // 1 request buat semua baris, hasil di-stream per CIDR (NDJSON)
+    const collected: { index: number; data: ScanResult }[] = [];
+    try {
+        const res = await fetch("/api/scan/stream", {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ raw_text: lines.join("\n") }),
+        });
+        if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split("\n");
+            buffer = events.pop() ?? "";
+            for (const raw of events) {
+                if (!raw.trim()) continue;
+                const event = JSON.parse(raw);
+                if (event.type === "start") setTotalScan(event.total);
+                else if (event.type === "result") {
+                    collected.push({ index: event.index, data: event.data });
+                    setProgress(event.done);
+                } else if (event.type === "error") {
+                    console.error("Backend Error:", event.cidr);
+                    setProgress(event.done);
+                }
+            }
+        }
+    } catch (error) { console.error(error); }
+
+    const accumulatedResults = collected.sort((a, b) => a.index - b.index).map((r) => r.data);
     setResults(accumulatedResults);
     saveToHistory("IP", targets, accumulatedResults, undefined);
     setLoading(false);
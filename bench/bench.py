@@ -0,0 +1,286 @@
+# Benchmark offline: fake WHOIS (APNIC/RADB), fake RIPEstat (HTTP) & fake DNS jalan di localhost,
+# lalu /api/scan dan /api/asn di-drive in-process (ASGI) dengan batch yang mirip pemakaian asli.
+#
+#   python bench/bench.py --cidrs 200 --batch 10 --concurrency 4 --latency whois=80,ripestat=120,dns=5 --error-rate 0.02
+#   python bench/bench.py --rounds 2 -o bench_output.txt     # round ke-2 = cache udah anget
+#
+# --recordings FILE = JSON hasil rekaman response asli, dipakai duluan sebelum data sintetis:
+#   {"apnic": {"-rB -L 1.2.3.0/24": "<raw whois>"}, "radb": {"1.2.3.0/24": "..."},
+#    "ripestat": {"bgp-state 1.2.3.0/24": {"data": {...}}}}
+# Env app (SCAN_CONCURRENCY, CACHE_MAX_ENTRIES, WHOIS_PERSISTENT, ...) tetap bisa di-set dari luar.
+import argparse
+import asyncio
+import collections
+import ipaddress
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import dns.message
+import dns.rcode
+import dns.rrset
+import httpx
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api")
+
+# === LATENCY & ERROR INJECTION ===
+class Upstreams:
+    def __init__(self, latency, jitter, error_rate, recordings):
+        self.latency, self.jitter, self.error_rate = latency, jitter, error_rate
+        self.recordings = recordings
+        self.calls = collections.Counter()
+        self.errors = collections.Counter()
+        self.rng = random.Random(43)
+
+    async def delay(self, upstream):
+        base = self.latency.get(upstream, self.latency.get("*", 0.0))
+        await asyncio.sleep(max(0.0, base + self.rng.uniform(-self.jitter, self.jitter)))
+
+    def hit(self, upstream, kind):
+        # True = request ini di-inject error
+        self.calls[f"{upstream} {kind}"] += 1
+        if self.rng.random() < self.error_rate:
+            self.errors[upstream] += 1
+            return True
+        return False
+
+def parse_latency(spec):
+    # "80" (semua upstream) atau "whois=80,ripestat=120,dns=5" (ms)
+    latency = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, ms = part.rpartition("=")
+        latency[name or "*"] = float(ms) / 1000
+    return latency
+
+# === FAKE WHOIS (PORT 43, SUPPORT -k) ===
+def whois_apnic_answer(q):
+    flags, _, target = q.rpartition(" ")
+    if target.endswith(".in-addr.arpa"):
+        labels = target.split(".")
+        if "-M" in flags:
+            # 1 domain object per /24 genap + 1 range object
+            out = "% [whois.apnic.net]\n\n"
+            for third in range(0, 256, 2):
+                out += f"domain:         {third}.{labels[0]}.{labels[1]}.in-addr.arpa\nnserver:        ns1.bench.example\nnserver:        ns2.bench.example\nsource:         APNIC\n\n"
+            return out
+        return f"% [whois.apnic.net]\n\ndomain:         {target}\nnserver:        ns1.bench.example\nsource:         APNIC\n\n"
+    try: net = ipaddress.ip_network(target, strict=False)
+    except ValueError: return "% [whois.apnic.net]\n\n%ERROR:101: no entries found\n\n"
+    def inetnum(block, name):
+        cls = "inetnum" if block.version == 4 else "inet6num"
+        rng = f"{block.network_address} - {block.broadcast_address}" if block.version == 4 else str(block)
+        return f"{cls}:        {rng}\nnetname:        {name}\ndescr:          Bench {name}\ncountry:        ID\nstatus:         ALLOCATED PORTABLE\nsource:         APNIC\n\n"
+    out = "% [whois.apnic.net]\n\n"
+    if "-m" in flags.split() or "-M" in flags.split():
+        sub = min(net.max_prefixlen, net.prefixlen + 2)
+        for i, child in enumerate(net.subnets(new_prefix=sub)):
+            if i >= 4: break
+            out += inetnum(child, f"CHILD-{i}")
+        return out
+    top = 12 if net.version == 4 else 29
+    if net.prefixlen > top: out += inetnum(net.supernet(new_prefix=top), "BENCH-ALLOC")
+    out += inetnum(net, "BENCH-NET")
+    return out
+
+def whois_radb_answer(q):
+    try: net = ipaddress.ip_network(q.strip(), strict=False)
+    except ValueError: return "%  No entries found for the selected source(s).\n"
+    cls = "route" if net.version == 4 else "route6"
+    return f"{cls}:          {net}\norigin:         AS{64500 + int(net.network_address) % 500}\nmnt-by:         MAINT-BENCH\nsource:         RADB\n\n"
+
+async def fake_whois(stats, reader, writer):
+    keep = False
+    try:
+        while True:
+            line = await reader.readline()
+            if not line: break
+            q = line.decode(errors="ignore").strip()
+            if q.startswith("-k"): keep, q = True, q[2:].strip()
+            # Query APNIC dari app selalu pakai flag (-rB ...), query RADB cuma CIDR polos
+            upstream = "whois:apnic" if q.startswith("-") else "whois:radb"
+            kind = " ".join(w for w in q.split() if w.startswith("-")) or "exact"
+            await stats.delay("whois")
+            if stats.hit(upstream, kind): break  # error = koneksi diputus tanpa jawaban
+            recorded = stats.recordings.get(upstream.split(":")[1], {}).get(q)
+            answer = recorded if recorded is not None else (whois_apnic_answer(q) if upstream == "whois:apnic" else whois_radb_answer(q))
+            writer.write(answer.encode())
+            if keep: writer.write(b"\n\n")
+            await writer.drain()
+            if not keep: break
+    except ConnectionError: pass
+    finally: writer.close()
+
+# === FAKE RIPESTAT (HTTP/1.1 KEEP-ALIVE) ===
+def ripestat_answer(endpoint, resource):
+    origin = 64500 + sum(map(ord, resource)) % 500
+    data = {
+        "bgp-state": {"bgp_state": [{"path": [3333, 174 + i % 3, origin]} for i in range(12)]},
+        "routing-status": {"visibility": {"v4": {"ris_peers_seeing": 12}, "v6": {"ris_peers_seeing": 0}}, "route_objects": [{"origin": origin, "source": "RADB"}]},
+        "network-info": {"asns": [str(origin)], "prefix": resource},
+        "rpki-roas": {"roas": [{"asn": origin, "prefix": resource, "max_length": 24, "validating_roas": []}]},
+        "as-overview": {"holder": f"BENCH-{resource}"},
+        "announced-prefixes": {"prefixes": [{"prefix": f"10.{i}.0.0/16"} for i in range(40)] + [{"prefix": "2001:db8::/32"}]},
+        "asn-neighbours": {"neighbours": [{"asn": 174 + i, "type": "left"} for i in range(20)]},
+    }.get(endpoint, {})
+    return {"status": "ok", "data": data}
+
+async def fake_ripestat(stats, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line: break
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""): pass
+            url = httpx.URL(request_line.split()[1].decode())
+            endpoint = url.path.strip("/").split("/")[1] if url.path.startswith("/data/") else url.path
+            resource = url.params.get("resource", "")
+            await stats.delay("ripestat")
+            if stats.hit("ripestat", endpoint):
+                status, body = "503 Service Unavailable", b"{}"
+            else:
+                recorded = stats.recordings.get("ripestat", {}).get(f"{endpoint} {resource}")
+                status, body = "200 OK", json.dumps(recorded if recorded is not None else ripestat_answer(endpoint, resource)).encode()
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n".encode() + body)
+            await writer.drain()
+    except ConnectionError: pass
+    finally: writer.close()
+
+# === FAKE DNS (UDP) ===
+class FakeDNS(asyncio.DatagramProtocol):
+    def __init__(self, stats):
+        self.stats = stats
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        asyncio.ensure_future(self.answer(data, addr))
+
+    async def answer(self, data, addr):
+        query = dns.message.from_wire(data)
+        response = dns.message.make_response(query)
+        await self.stats.delay("dns")
+        if self.stats.hit("dns", "PTR"): response.set_rcode(dns.rcode.SERVFAIL)
+        else:
+            name = query.question[0].name
+            # Host ganjil nggak punya PTR (coverage sweep jadi kelihatan parsial)
+            if int(name.labels[0] or b"0", 16 if b"ip6" in name.labels else 10) % 2:
+                response.set_rcode(dns.rcode.NXDOMAIN)
+            else:
+                response.answer.append(dns.rrset.from_text(name, 300, "IN", "PTR", f"host-{name.labels[0].decode()}.bench.example."))
+        self.transport.sendto(response.to_wire(), addr)
+
+# === WORKLOAD ===
+def make_cidrs(count, dup_ratio, v6_ratio, rng):
+    cidrs = []
+    for _ in range(count):
+        if cidrs and rng.random() < dup_ratio:
+            cidrs.append(rng.choice(cidrs))
+        elif rng.random() < v6_ratio:
+            cidrs.append(f"2001:db8:{rng.randrange(65536):x}::/48")
+        else:
+            prefixlen = rng.choice((24, 24, 24, 23, 22, 20))
+            net = ipaddress.ip_network(f"{rng.randrange(1, 223)}.{rng.randrange(256)}.{rng.randrange(256)}.0/{prefixlen}", strict=False)
+            cidrs.append(str(net))
+    return cidrs
+
+def percentile(sorted_values, pct):
+    if not sorted_values: return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))]
+
+async def drive(client, jobs, concurrency):
+    # jobs: [(endpoint, json_body)], dijalanin dengan N client paralel
+    latencies, failures = collections.defaultdict(list), collections.Counter()
+    queue = collections.deque(jobs)
+
+    async def worker():
+        while queue:
+            path, body = queue.popleft()
+            start = time.perf_counter()
+            try:
+                resp = await client.post(path, json=body)
+                ok = resp.status_code == 200
+            except Exception: ok = False
+            latencies[path].append(time.perf_counter() - start)
+            if not ok: failures[path] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return latencies, failures, time.perf_counter() - start
+
+def report(title, latencies, failures, elapsed, cidr_count, stats):
+    lines = [f"== {title} ==", f"wall time {elapsed:.2f}s, {cidr_count / elapsed:.1f} CIDR/s"]
+    for path, values in sorted(latencies.items()):
+        values.sort()
+        ms = lambda v: f"{v * 1000:8.1f}"
+        lines.append(f"{path:<10} n={len(values):<5} err={failures[path]:<4} req/s={len(values) / elapsed:7.1f}  "
+                     f"p50={ms(percentile(values, 50))} p95={ms(percentile(values, 95))} p99={ms(percentile(values, 99))} max={ms(values[-1])} ms")
+    lines.append("upstream calls:")
+    for key, count in sorted(stats.calls.items()): lines.append(f"  {key:<28} {count}")
+    if stats.errors: lines.append("injected errors: " + ", ".join(f"{k}={v}" for k, v in sorted(stats.errors.items())))
+    return "\n".join(lines)
+
+async def main(args):
+    recordings = {}
+    if args.recordings:
+        with open(args.recordings, encoding="utf-8") as f: recordings = json.load(f)
+    stats = Upstreams(parse_latency(args.latency), args.jitter / 1000, args.error_rate, recordings)
+    loop = asyncio.get_running_loop()
+
+    whois_srv = await asyncio.start_server(lambda r, w: fake_whois(stats, r, w), "127.0.0.1", 0)
+    http_srv = await asyncio.start_server(lambda r, w: fake_ripestat(stats, r, w), "127.0.0.1", 0)
+    dns_transport, _ = await loop.create_datagram_endpoint(lambda: FakeDNS(stats), local_addr=("127.0.0.1", 0))
+    whois_port = whois_srv.sockets[0].getsockname()[1]
+
+    # Env dibaca index.py waktu import, jadi harus di-set sebelum import
+    os.environ.update({
+        "WHOIS_PORT": str(whois_port), "WHOIS_APNIC": "127.0.0.1", "WHOIS_RADB": "localhost",
+        "RIPESTAT_URL": f"http://127.0.0.1:{http_srv.sockets[0].getsockname()[1]}",
+        "DNS_NAMESERVERS": "127.0.0.1", "DNS_PORT": str(dns_transport.get_extra_info("sockname")[1]),
+    })
+    os.environ.setdefault("JOB_DB", os.path.join(tempfile.mkdtemp(prefix="bench-"), "jobs.db"))
+    sys.path.insert(0, API_DIR)
+    import index
+
+    rng = random.Random(args.seed)
+    cidrs = make_cidrs(args.cidrs, args.dup_ratio, args.v6_ratio, rng)
+    jobs = [("/api/scan", {"raw_text": "\n".join(cidrs[i:i + args.batch]), "ptr_sweep": args.ptr_sweep}) for i in range(0, len(cidrs), args.batch)]
+    jobs += [("/api/asn", {"asn": f"AS{64500 + rng.randrange(args.asns * 2)}"}) for _ in range(args.asns)]
+    rng.shuffle(jobs)
+
+    output = []
+    transport = httpx.ASGITransport(app=index.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for round_no in range(1, args.rounds + 1):
+            stats.calls.clear(); stats.errors.clear()
+            latencies, failures, elapsed = await drive(client, list(jobs), args.concurrency)
+            output.append(report(f"round {round_no}: {len(cidrs)} CIDR in {len(jobs)} requests, concurrency {args.concurrency}", latencies, failures, elapsed, len(cidrs), stats))
+            print(output[-1], flush=True)
+
+    # Tutup koneksi keep-alive app dulu biar handler fake server selesai normal
+    for pool in index._whois_pools.values(): pool.close()
+    await index.get_http_client().aclose()
+    await asyncio.sleep(0.1)
+    whois_srv.close(); http_srv.close(); dns_transport.close()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: f.write("\n\n".join(output) + "\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark /api/scan & /api/asn dengan upstream palsu")
+    parser.add_argument("--cidrs", type=int, default=100, help="jumlah baris CIDR total")
+    parser.add_argument("--batch", type=int, default=10, help="baris per request /api/scan (maks 50)")
+    parser.add_argument("--asns", type=int, default=10, help="jumlah request /api/asn")
+    parser.add_argument("--concurrency", type=int, default=4, help="client paralel")
+    parser.add_argument("--rounds", type=int, default=1, help="ulang workload yang sama (round >1 = cache anget)")
+    parser.add_argument("--latency", default="whois=60,ripestat=100,dns=5", help="ms, global atau per upstream")
+    parser.add_argument("--jitter", type=float, default=20, help="ms, +/- acak")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="0..1, per request upstream")
+    parser.add_argument("--dup-ratio", type=float, default=0.1, help="porsi CIDR duplikat dalam workload")
+    parser.add_argument("--v6-ratio", type=float, default=0.1)
+    parser.add_argument("--ptr-sweep", action="store_true")
+    parser.add_argument("--recordings", help="JSON response rekaman (lihat atas)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-o", "--output", help="tulis report juga ke file")
+    asyncio.run(main(parser.parse_args()))
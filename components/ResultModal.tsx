@@ -224,6 +224,9 @@ export default function ResultModal({ data, onClose, isHostmaster }: ResultModal
                                     {item.ptr_record || "No Record"}
                                 </pre>
                             </div>
+                            {item.ptr_coverage && (
+                                <p className="text-[10px] text-slate-500 font-mono mt-1">PTR Coverage: {item.ptr_coverage}</p>
+                            )}
                         </div>
 
                         {/* 4. Route Objects (Blue Badges) */}
@@ -0,0 +1,5 @@
+# Backend = single file api/index.py; env yang dibaca waktu import di-set dulu
+import os, sys, tempfile
+
+os.environ.setdefault("JOB_DB", os.path.join(tempfile.mkdtemp(prefix="test-"), "jobs.db"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api"))
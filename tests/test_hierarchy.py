@@ -0,0 +1,54 @@
+# task_apnic_hierarchy: parent = 1 level di atas objek CIDR sendiri (kayak -l dulu), lewat WHOIS live maupun index lokal
+import asyncio
+import pytest
+import index
+
+OBJECTS = [
+    ("1.2.0.0 - 1.2.255.255", "ISP-ALLOC"),
+    ("1.2.0.0 - 1.2.15.255", "REGION"),
+    ("1.2.3.0 - 1.2.3.255", "CUST"),
+    ("1.2.3.0 - 1.2.3.63", "SUB"),
+]
+
+def rpsl(objs):
+    return "".join(f"inetnum:        {rng}\nnetname:        {name}\ndescr:          {name} desc\nsource:         APNIC\n\n" for rng, name in objs)
+
+def whois_answer(query):
+    # Fake APNIC: -L = semua pembungkus (paling luar dulu, kayak APNIC), -m = 1 level di bawah
+    flags, _, target = query.rpartition(" ")
+    _, start, end = index.parse_range(target)
+    spans = [(obj, index.parse_range(obj[0])) for obj in OBJECTS]
+    if "-m" in flags.split():
+        inside = [(o, r) for o, r in spans if r[1] >= start and r[2] <= end and (r[1], r[2]) != (start, end)]
+        return rpsl([o for o, r in inside if not any(p != r and p[1] <= r[1] and p[2] >= r[2] and p[1] >= start and p[2] <= end and (p[1], p[2]) != (start, end) for _, p in inside)])
+    return rpsl([o for o, r in spans if r[1] <= start and r[2] >= end])
+
+@pytest.fixture(params=["live", "index"])
+def source(request, monkeypatch):
+    if request.param == "live":
+        async def fake_query(query, server=None, max_objects=None): return whois_answer(query)
+        monkeypatch.setattr(index, "query_socket", fake_query)
+        monkeypatch.setattr(index, "load_apnic_index", lambda: None)
+    else:
+        tree = index.PrefixTree()
+        for obj in index.parse_apnic(rpsl(OBJECTS)): tree.insert(obj['_range'], obj)
+        monkeypatch.setattr(index, "load_apnic_index", lambda: tree)
+    return request.param
+
+def hierarchy(cidr, include_children=True):
+    return asyncio.run(index.task_apnic_hierarchy(cidr, include_children=include_children))
+
+def test_parent_is_one_level_above_own_object(source):
+    result = hierarchy("1.2.3.0/24")
+    assert result["parent_name"] == "REGION"
+    assert result["parent_net"] == "1.2.0.0 - 1.2.15.255"
+    # Ancestor yang lebih tinggi (ISP-ALLOC) nggak ikut masuk children
+    assert result["children"] == "CUST (1.2.3.0 - 1.2.3.255) : CUST desc | SUB (1.2.3.0 - 1.2.3.63) : SUB desc"
+
+def test_without_children_keeps_own_object(source):
+    assert hierarchy("1.2.3.0/24", include_children=False)["children"] == "CUST (1.2.3.0 - 1.2.3.255) : CUST desc"
+
+def test_no_exact_object_parent_is_smallest_covering(source):
+    result = hierarchy("1.2.3.0/25")
+    assert result["parent_name"] == "CUST"
+    assert result["children"] == "SUB (1.2.3.0 - 1.2.3.63) : SUB desc"
@@ -0,0 +1,57 @@
+# JobStore: paging pakai cursor idx & lease per job (1 job cuma dikerjain 1 proses)
+import asyncio, time
+import pytest
+import index
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = index.JobStore(str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(index, "_job_store", store)
+    return store
+
+def test_results_cursor_stops_at_pending(store):
+    job_id = store.create([f"10.0.{i}.0/24" for i in range(5)])
+    for idx in (0, 1, 3): store.save_result(job_id, idx, "done", {"i": idx})
+    assert [r["index"] for r in store.results(job_id, -1, 10)] == [0, 1]
+    # Item 2 masih pending -> cursor nggak lewat, item 3 belum dikirim
+    assert store.results(job_id, 1, 10) == []
+    store.save_result(job_id, 2, "error", {"error": "x"})
+    assert [(r["index"], r["status"]) for r in store.results(job_id, 1, 10)] == [(2, "error"), (3, "done")]
+    assert [r["index"] for r in store.results(job_id, -1, 1)] == [0]
+
+def test_lease_claim_renew_release(store):
+    job_id = store.create(["10.0.0.0/24"])
+    assert store.claim(job_id, "a") and store.claim(job_id, "a")
+    assert not store.claim(job_id, "b")
+    # Lease kadaluarsa -> diambil alih, owner lama nggak bisa perpanjang / lepas lease
+    store.db.execute("UPDATE jobs SET lease_until = ? WHERE id = ?", (time.time() - 1, job_id))
+    assert store.claim(job_id, "b")
+    assert not store.renew(job_id, "a")
+    store.release(job_id, "a")
+    assert not store.claim(job_id, "a")
+    store.release(job_id, "b")
+    assert store.claim(job_id, "a")
+    store.set_status(job_id, "done")
+    store.release(job_id, "a")
+    assert not store.claim(job_id, "b")
+
+def test_start_job_skips_job_leased_elsewhere(store, monkeypatch):
+    calls = []
+    async def fake_scan(cidr, deadline=None, **options):
+        calls.append(cidr)
+        return {"cidr": cidr}
+    monkeypatch.setattr(index, "scan_ip_logic_parallel", fake_scan)
+
+    async def run():
+        other = store.create(["10.0.0.0/24"])
+        assert store.claim(other, "proses-lain")
+        mine = store.create(["10.1.0.0/24", "10.2.0.0/24"])
+        await index.resume_jobs()
+        assert other not in index._job_runners
+        await index._job_runners[mine]
+        return other, mine
+
+    other, mine = asyncio.run(run())
+    assert calls == ["10.1.0.0/24", "10.2.0.0/24"]
+    assert store.get(mine)["status"] == "done" and store.get(other)["status"] == "queued"
+    assert store.db.execute("SELECT lease_owner FROM jobs WHERE id = ?", (mine,)).fetchone() == (None,)
@@ -0,0 +1,96 @@
+# Cek acak PrefixBatch lawan ipaddress & brute force
+#   python -m pytest -q tests
+import ipaddress, random
+import pytest
+import index
+
+V4_BASE = int(ipaddress.IPv4Address("10.0.0.0"))
+V6_BASE = int(ipaddress.IPv6Address("2001:db8::"))
+
+def random_range(rng):
+    # Ruang alamat sempit biar banyak yang beririsan / nested; IPv6 sengaja lewat batas word 64-bit
+    if rng.random() < 0.5:
+        version, base, span, width = 4, V4_BASE, 1 << 12, 32
+    else:
+        version, base, span, width = 6, V6_BASE, 1 << 70, 128
+    if rng.random() < 0.4:
+        plen = rng.randrange(width - span.bit_length() + 1, width + 1)
+        host = (1 << (width - plen)) - 1
+        start = (base + rng.randrange(span)) & ~host
+        return version, start, start | host
+    start = base + rng.randrange(span)
+    return version, start, start + rng.randrange(span >> rng.randrange(1, 8))
+
+def random_rows(rng, n):
+    rows = [random_range(rng) for _ in range(n)]
+    # Baris invalid (None / kebalik) harus dilewati semua operasi
+    for _ in range(n // 10): rows[rng.randrange(n)] = None
+    rows[rng.randrange(n)] = (4, V4_BASE + 10, V4_BASE + 5)
+    return rows
+
+def valid(row):
+    return row is not None and row[1] <= row[2]
+
+def address(version, value):
+    return ipaddress.IPv4Address(value) if version == 4 else ipaddress.IPv6Address(value)
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if index.np is None: pytest.skip("numpy nggak ke-install")
+    else: monkeypatch.setattr(index, "np", None)
+    return request.param
+
+# === PREFIX BATCH ===
+def test_batch_cidr_strings(backend):
+    rng = random.Random(1)
+    for _ in range(20):
+        rows = random_rows(rng, 60)
+        expected = []
+        for row in filter(valid, rows):
+            expected += [str(n) for n in ipaddress.summarize_address_range(address(row[0], row[1]), address(row[0], row[2]))]
+        assert index.PrefixBatch(rows).cidr_strings() == expected
+
+def test_batch_sizes(backend):
+    rng = random.Random(2)
+    rows = random_rows(rng, 300)
+    sizes = list(index.PrefixBatch(rows).sizes())
+    for row, size in zip(rows, sizes):
+        assert size == pytest.approx(row[2] - row[1] + 1 if valid(row) else 0, rel=1e-12)
+
+def test_batch_covered_by(backend):
+    rng = random.Random(3)
+    for _ in range(20):
+        rows, others = random_rows(rng, 80), random_rows(rng, 40)
+        result = list(index.PrefixBatch(rows).covered_by(index.PrefixBatch(others)))
+        for row, got in zip(rows, result):
+            want = valid(row) and any(valid(o) and o[0] == row[0] and o[1] <= row[1] and o[2] >= row[2] for o in others)
+            assert bool(got) == want
+
+def test_batch_overlaps(backend):
+    rng = random.Random(4)
+    for _ in range(20):
+        rows = random_rows(rng, 80)
+        result = list(index.PrefixBatch(rows).overlaps())
+        for i, (row, got) in enumerate(zip(rows, result)):
+            want = valid(row) and any(
+                j != i and valid(o) and o[0] == row[0] and o[1] <= row[2] and row[1] <= o[2] for j, o in enumerate(rows))
+            assert bool(got) == want
+
+def test_batch_from_strings_rejects_bad_ranges(backend):
+    lines = ["1.2.3.4 - 2001:db8::1", "2001:db8::1 - 1.2.3.4", "10.0.0.9 - 10.0.0.1", "300.0.0.1", "10.0.0.0 - 10.0.0.5", "2001:db8::/126"]
+    assert index.PrefixBatch.from_strings(lines).cidr_strings() == ["10.0.0.0/30", "10.0.0.4/31", "2001:db8::/126"]
+
+def test_parse_scan_strings_matches_parse_scan_input(backend):
+    rng = random.Random(5)
+    lines = []
+    for _ in range(200):
+        row = random_range(rng)
+        start, end = address(row[0], row[1]), address(row[0], row[2])
+        kind = rng.randrange(4)
+        if kind == 0 and row[0] == 4: lines.append(f"{start} - {end}")
+        elif kind == 1: lines.append(f"{start} - {address(6 if row[0] == 4 else 4, row[1] & 0xffffffff)}")
+        elif kind == 2: lines.append(f"AS{row[1] & 0xffff}")
+        else: lines.append(f"{start}/{rng.randrange(0, 33 if row[0] == 4 else 129)}")
+    text = "\n".join(lines)
+    assert index.parse_scan_strings(text, len(lines)) == [str(n) for n in index.parse_scan_input(text, len(lines))]
@@ -0,0 +1,61 @@
+# Cek acak PrefixTree (covering / covered / exact) lawan brute force
+import ipaddress, random
+import pytest
+import index
+
+V4_BASE = int(ipaddress.IPv4Address("10.0.0.0"))
+V6_BASE = int(ipaddress.IPv6Address("2001:db8::"))
+
+def random_range(rng):
+    # Ruang alamat sempit biar banyak yang beririsan / nested; IPv6 sengaja lewat batas word 64-bit
+    if rng.random() < 0.5:
+        version, base, span, width = 4, V4_BASE, 1 << 12, 32
+    else:
+        version, base, span, width = 6, V6_BASE, 1 << 70, 128
+    if rng.random() < 0.4:
+        plen = rng.randrange(width - span.bit_length() + 1, width + 1)
+        host = (1 << (width - plen)) - 1
+        start = (base + rng.randrange(span)) & ~host
+        return version, start, start | host
+    start = base + rng.randrange(span)
+    return version, start, start + rng.randrange(span >> rng.randrange(1, 8))
+
+def test_tree_covering_and_covered():
+    rng = random.Random(6)
+    entries = [random_range(rng) for _ in range(400)]
+    tree = index.PrefixTree()
+    for i, entry in enumerate(entries): tree.insert(entry, i)
+    assert tree.size == len(entries)
+    for _ in range(300):
+        target = random_range(rng)
+        version, start, end = target
+        covering = tree.covering(target)
+        assert sorted(e[2] for e in covering) == [i for i, e in enumerate(entries) if e[0] == version and e[1] <= start and e[2] >= end]
+        sizes = [e[1] - e[0] for e in covering]
+        assert sizes == sorted(sizes)
+        assert tree.longest_match(target) == (covering[0] if covering else None)
+        assert sorted(e[2] for e in tree.exact(target)) == [i for i, e in enumerate(entries) if e == target]
+        covered = tree.covered(target)
+        assert sorted(e[2] for e in covered) == [i for i, e in enumerate(entries) if e[0] == version and e[1] >= start and e[2] <= end]
+
+def test_tree_string_keys():
+    tree = index.PrefixTree()
+    tree.insert("10.0.0.0 - 10.0.0.255", "net")
+    tree.insert("10.0.0.0/25", "sub")
+    tree.insert(ipaddress.ip_network("2001:db8::/32"), "v6")
+    assert [e[2] for e in tree.covering("10.0.0.1")] == ["sub", "net"]
+    assert [e[2] for e in tree.covered("10.0.0.0/24")] == ["net", "sub"]
+    assert [e[2] for e in tree.covering("2001:db8:1::/48")] == ["v6"]
+    assert tree.covering("10.0.1.0/24") == []
+    with pytest.raises(ValueError): tree.insert("bukan range", None)
+
+def test_tree_duplicates_and_families():
+    tree = index.PrefixTree()
+    tree.insert("0.0.0.0/0", "default")
+    tree.insert("10.0.0.0/8", "a")
+    tree.insert("10.0.0.0/8", "b")
+    tree.insert("::/0", "default6")
+    assert sorted(e[2] for e in tree.exact("10.0.0.0/8")) == ["a", "b"]
+    assert [e[2] for e in tree.covering("10.1.2.3")][-1] == "default"
+    assert [e[2] for e in tree.covering("::ffff:10.1.2.3")] == ["default6"]
+    assert len(tree.covered("0.0.0.0/0")) == 3 and tree.size == 4
@@ -0,0 +1,29 @@
+# Delegasi reverse /24 untuk aggregate: run dihitung dari nomor /24, aggregate kegedean ditolak
+import asyncio
+import index
+
+def test_delegation_runs_fill_gaps():
+    ns = ("ns1.example",)
+    runs = index.delegation_runs(10, 20, {12: ns, 13: ns, 15: None, 16: None, 30: ns, 5: ns})
+    assert runs == [[10, 11, ()], [12, 13, ns], [14, 14, ()], [15, 16, None], [17, 20, ()]]
+    assert index.delegation_runs(0, 3, {}) == [[0, 3, ()]]
+
+def test_aggregate_runs(monkeypatch):
+    async def fake(query, server=None, **kw):
+        assert query == "-rB -M 1.10.in-addr.arpa"
+        return "domain: 2-3.1.10.in-addr.arpa\nnserver: NS1.example\n\ndomain: 6.1.10.in-addr.arpa\nnserver: ns2.example\n"
+    monkeypatch.setattr(index, "query_socket", fake)
+    result = asyncio.run(index.task_reverse_dns("10.1.0.0/21"))
+    assert result["ptr_record"].split("\n")[1:] == [
+        " ↳ 10.1.0.0/23: No Delegation",
+        " ↳ 10.1.2.0/23: ns1.example (APNIC)",
+        " ↳ 10.1.4.0/23: No Delegation",
+        " ↳ 10.1.6.0/24: ns2.example (APNIC)",
+        " ↳ 10.1.7.0/24: No Delegation",
+    ]
+
+def test_too_large_aggregate_skips_queries(monkeypatch):
+    async def fake(*args, **kwargs): raise AssertionError("nggak boleh query")
+    monkeypatch.setattr(index, "query_socket", fake)
+    for cidr in ["0.0.0.0/0", "0.0.0.0/4", "10.0.0.0/7"]:
+        assert "too large" in asyncio.run(index.task_reverse_dns(cidr))["ptr_record"]
@@ -0,0 +1,66 @@
+# RFC 6811 origin validation: validate_origin / rpki_summary / load_vrp_file
+import json
+import index
+
+def vrp(asn, prefix, max_length=None):
+    return index.make_vrp(asn, prefix, max_length)
+
+def test_not_found():
+    assert index.validate_origin("10.0.0.0/24", 64500, []) == ("not-found", [])
+    assert index.rpki_summary("10.0.0.0/24", [64500], []) == ("NOT FOUND", "-")
+
+def test_valid_and_max_length_default():
+    exact = vrp("AS64500", "10.0.0.0/24")
+    assert exact["max_length"] == 24
+    assert index.validate_origin("10.0.0.0/24", 64500, [exact]) == ("valid", [exact])
+    # maxLength default = panjang prefix VRP -> more-specific invalid
+    assert index.validate_origin("10.0.0.0/25", 64500, [exact])[0] == "invalid-length"
+
+def test_invalid_length_lists_only_same_asn():
+    own, other = vrp("AS64500", "10.0.0.0/16", 20), vrp("AS64501", "10.0.0.0/16", 24)
+    assert index.validate_origin("10.0.0.0/24", 64500, [own, other]) == ("invalid-length", [own])
+    assert index.rpki_summary("10.0.0.0/24", [64500], [own, other]) == ("INVALID (LENGTH)", "AS64500 > max /20")
+
+def test_invalid_asn():
+    roa = vrp("AS64501", "10.0.0.0/16", 24)
+    assert index.validate_origin("10.0.0.0/24", 64500, [roa]) == ("invalid-asn", [roa])
+    assert index.rpki_summary("10.0.0.0/24", [64500], [roa]) == ("INVALID (ASN)", "Origin AS64500 vs ROA: AS64501 /24")
+
+def test_one_matching_vrp_among_several_is_valid():
+    vrps = [vrp("AS64501", "10.0.0.0/8", 24), vrp("AS64500", "10.0.0.0/16", 16), vrp("AS64500", "10.0.0.0/20", 24)]
+    state, matched = index.validate_origin("10.0.1.0/24", 64500, vrps)
+    assert state == "valid" and matched == [vrps[2]]
+    assert index.rpki_summary("10.0.1.0/24", [64500], vrps) == ("VALID", "AS64500 /24")
+
+def test_as0_never_matches():
+    as0 = vrp("AS0", "10.0.0.0/16", 24)
+    assert index.validate_origin("10.0.0.0/24", 64500, [as0])[0] == "invalid-asn"
+    # Origin AS0 juga nggak pernah valid, walau ada VRP AS0
+    assert index.validate_origin("10.0.0.0/24", 0, [as0])[0] == "invalid-asn"
+    assert index.rpki_summary("10.0.0.0/24", [64500], [as0]) == ("INVALID (AS0)", "Terminated (Drop)")
+    # AS0 + VRP lain yang match -> VRP AS0 nggak ngalahin yang valid
+    assert index.validate_origin("10.0.0.0/24", 64500, [as0, vrp("AS64500", "10.0.0.0/24")])[0] == "valid"
+
+def test_unknown_origin_reports_roas():
+    assert index.rpki_summary("10.0.0.0/24", [], [vrp("AS64500", "10.0.0.0/24")]) == ("UNKNOWN", "ROA: AS64500 /24")
+
+def test_each_origin_validated():
+    vrps = [vrp("AS64500", "10.0.0.0/24")]
+    status, detail = index.rpki_summary("10.0.0.0/24", [64500, 64501, 64500], vrps)
+    assert status == "AS64500: VALID | AS64501: INVALID (ASN)"
+    assert detail == "AS64500: AS64500 /24 | AS64501: Origin AS64501 vs ROA: AS64500 /24"
+
+def test_covering_vrps_from_ripestat_roas():
+    roas = [{"asn": "AS64500", "prefix": "10.0.0.0/16", "max_length": 24}, {"asn": "AS64501", "prefix": "10.1.0.0/16", "max_length": 24},
+            {"asn": "AS64502", "prefix": "2001:db8::/32", "max_length": 48}, {"asn": "bukan asn"}]
+    assert [v["asn"] for v in index.covering_vrps("10.0.5.0/24", roas)] == [64500]
+
+def test_load_vrp_file(tmp_path):
+    csv_path = tmp_path / "vrps.csv"
+    csv_path.write_text("ASN,IP Prefix,Max Length,Trust Anchor\nAS64500,10.0.0.0/16,24,apnic\nAS0,10.9.0.0/16,16,apnic\nrusak,,\n")
+    json_path = tmp_path / "vrps.json"
+    json_path.write_text(json.dumps({"roas": [{"asn": "AS64500", "prefix": "10.0.0.0/16", "maxLength": 24, "ta": "apnic"}, {"asn": "x"}]}))
+    for path in (csv_path, json_path):
+        tree = index.load_vrp_file(str(path))
+        assert [e[2]["asn"] for e in tree.covering("10.0.3.0/24")] == [64500]
+    assert index.load_vrp_file(str(csv_path)).size == 2
@@ -0,0 +1,47 @@
+# RPSLStreamParser: chunk acak (dipotong di sembarang byte) harus sama dengan parse sekali jalan
+import random
+import index
+
+def random_rpsl(rng):
+    # -> (teks RPSL, objek yang diharapkan dalam bentuk flat())
+    text, expected = ["% header server\n\n"], []
+    for n in range(rng.randrange(5, 30)):
+        cls = rng.choice(["inetnum", "route", "aut-num", "domain"])
+        lines, obj = [], {"_class": cls}
+        for key in [cls] + rng.sample(["netname", "descr", "remarks", "mnt-by", "source"], 3) + ["descr"]:
+            words = [rng.choice(["alpha", "beta", "gamma", "Jakarta", "Müller", "x:y"]) for _ in range(rng.randrange(1, 4))]
+            lines.append(f"{key.upper() if rng.random() < 0.1 else key}:{' ' * rng.randrange(1, 9)}{words[0]}")
+            for word in words[1:]: lines.append(f"{rng.choice([' ', chr(9), '+'])}{word}")
+            if rng.random() < 0.1: lines.append("# komentar di dalam objek")
+            obj[key] = f"{obj[key]} | {' '.join(words)}" if key in obj else " ".join(words)
+        expected.append(obj)
+        text.append("\n".join(lines) + "\n\n")
+        if rng.random() < 0.2: text.append("% komentar server\n\n")
+    joined = "".join(text)
+    return (joined.replace("\n", "\r\n") if rng.random() < 0.3 else joined), expected
+
+def test_rpsl_stream_chunking():
+    rng = random.Random(7)
+    for _ in range(50):
+        text, expected = random_rpsl(rng)
+        data = text.encode()
+        assert [o.flat() for o in index.iter_rpsl([data])] == expected
+        # Dipotong di sembarang byte (termasuk di tengah karakter UTF-8 / CRLF)
+        cuts = sorted(rng.sample(range(1, len(data)), min(len(data) - 1, rng.randrange(1, 40))))
+        chunks = [data[a:b] for a, b in zip([0] + cuts, cuts + [len(data)])]
+        assert [o.flat() for o in index.iter_rpsl(chunks)] == expected
+        assert index.parse_rpsl(text) == expected
+
+def test_rpsl_unterminated_last_object():
+    parser = index.RPSLStreamParser()
+    assert parser.feed(b"route: 10.0.0.0/24\norigin: AS1\n") == []
+    objs = parser.close()
+    assert [(o.cls, o.first("origin")) for o in objs] == [("route", "AS1")]
+    assert parser.close() == []
+
+def test_rpsl_list_values_and_continuations():
+    text = "route:  10.0.0.0/24\norigin: AS1\nmnt-by: A\nmnt-by: B\ndescr: satu\n  dua\n+\n\tTiga\n\n"
+    (obj,) = list(index.iter_rpsl([text]))
+    assert obj.cls == "route" and obj["mnt-by"] == ["A", "B"]
+    assert obj.first("descr") == "satu dua Tiga" and obj.first("remarks", "-") == "-"
+    assert obj.flat() == {"_class": "route", "route": "10.0.0.0/24", "origin": "AS1", "mnt-by": "A | B", "descr": "satu dua Tiga"}
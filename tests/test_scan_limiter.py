@@ -0,0 +1,54 @@
+# FairLimiter: slot scan dibagi round-robin antar request, bukan FIFO
+import asyncio
+import index
+
+async def hold(limiter, owner, order, release):
+    async with limiter.slot(owner):
+        order.append(owner)
+        await release.wait()
+
+def test_round_robin_between_owners():
+    async def run():
+        limiter, order, release = index.FairLimiter(1), [], asyncio.Event()
+        tasks = [asyncio.ensure_future(hold(limiter, "batch", order, release)) for _ in range(5)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(hold(limiter, "single", order, release)))
+        await asyncio.sleep(0)
+        assert limiter.waiting == 5 and len(limiter.queues) == 2
+        release.set()
+        await asyncio.gather(*tasks)
+        return order, limiter
+
+    order, limiter = asyncio.run(run())
+    # Request "single" dapat slot berikutnya, nggak nunggu 4 scan batch yang ngantri duluan
+    assert order == ["batch", "batch", "single", "batch", "batch", "batch"]
+    assert limiter.free == 1 and limiter.waiting == 0
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def run():
+        limiter, order, release = index.FairLimiter(1), [], asyncio.Event()
+        first = asyncio.ensure_future(hold(limiter, "a", order, release))
+        await asyncio.sleep(0)
+        waiting = asyncio.ensure_future(hold(limiter, "b", order, release))
+        granted = asyncio.ensure_future(hold(limiter, "c", order, release))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+        release.set()
+        await asyncio.gather(first, granted)
+        # Slot udah dikasih tapi task di-cancel sebelum jalan -> slot dioper, nggak hilang
+        release.clear()
+        holder = asyncio.ensure_future(hold(limiter, "d", order, release))
+        await asyncio.sleep(0)
+        late = asyncio.ensure_future(hold(limiter, "e", order, release))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.sleep(0)
+        late.cancel()
+        await asyncio.gather(holder, late, return_exceptions=True)
+        return order, limiter
+
+    order, limiter = asyncio.run(run())
+    assert order == ["a", "c", "d"]
+    assert limiter.free == 1 and not limiter.queues
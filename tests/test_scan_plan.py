@@ -0,0 +1,101 @@
+# ScanPlan: dedupe + fan-out baris input, grup per supernet terkecil; run_scan_plan: 1 query hierarchy per grup
+import asyncio
+import index
+
+def plan_for(text):
+    return index.ScanPlan(index.parse_scan_input(text))
+
+def test_duplicates_scanned_once_and_fanned_out():
+    plan = plan_for("10.0.0.0/24\n8.8.8.8\n10.0.0.0/24\n10.0.0.0/24")
+    assert plan.targets == ["10.0.0.0/24", "8.8.8.8/32"]
+    assert plan.indices["10.0.0.0/24"] == [0, 2, 3]
+    assert plan.indices["8.8.8.8/32"] == [1]
+
+def test_expanded_range_is_one_group():
+    plan = plan_for("10.0.0.1 - 10.0.0.254")
+    assert len(plan.targets) == 14
+    assert set(plan.group_of) == set(plan.targets)
+    assert set(plan.group_of.values()) == {"10.0.0.0/24"}
+
+def test_nested_targets_share_smallest_supernet():
+    plan = plan_for("10.1.0.0/24\n10.1.0.128/25\n10.1.0.5\n10.1.3.0/24\n10.1.4.0/24\n192.168.1.1")
+    assert {t: plan.group_of.get(t) for t in plan.targets} == {
+        "10.1.0.0/24": "10.1.0.0/22", "10.1.0.128/25": "10.1.0.0/22", "10.1.0.5/32": "10.1.0.0/22", "10.1.3.0/24": "10.1.0.0/22",
+        # 10.1.4.0/24 udah di luar /22 -> sendirian, nggak digrup
+        "10.1.4.0/24": None, "192.168.1.1/32": None,
+    }
+
+def test_groups_never_wider_than_limit():
+    # Target /8 yang nutupin member lain nggak boleh bikin grup selebar /8 (-M-nya pasti kepotong)
+    plan = plan_for("10.0.0.0/8\n10.1.0.0/24\n10.1.0.128/25\n2001:db8::/32\n2001:db8::/64")
+    assert "10.0.0.0/8" not in plan.group_of and "2001:db8::/32" not in plan.group_of
+    assert plan.group_of["10.1.0.0/24"] == plan.group_of["10.1.0.128/25"] == "10.1.0.0/24"
+    assert "2001:db8::/64" not in plan.group_of
+    for supernet in plan.group_of.values():
+        net = index.ipaddress.ip_network(supernet)
+        assert net.prefixlen >= index.SCAN_GROUP_MIN_PLEN[net.version]
+
+def test_v6_groups_and_families_stay_apart():
+    plan = plan_for("2001:db8::/64\n2001:db8:0:1::/64\n2001:db9::/64\n::ffff:0:0/120\n0.0.0.0/24")
+    assert plan.group_of["2001:db8::/64"] == plan.group_of["2001:db8:0:1::/64"] == "2001:db8::/63"
+    assert "2001:db9::/64" not in plan.group_of
+    assert "0.0.0.0/24" not in plan.group_of
+
+def test_run_scan_plan_queries_each_group_once(monkeypatch):
+    calls, seen = [], {}
+
+    async def fake_group_hierarchy(supernet):
+        calls.append(supernet)
+        await asyncio.sleep(0.01)
+        return "tree:" + supernet
+
+    async def fake_scan(target, deadline=None, shared_hierarchy=None, **options):
+        seen[target] = await shared_hierarchy() if shared_hierarchy else None
+        return {"cidr": target}
+
+    monkeypatch.setattr(index, "group_hierarchy", fake_group_hierarchy)
+    monkeypatch.setattr(index, "scan_ip_limited", fake_scan)
+    plan = plan_for("10.0.0.1 - 10.0.0.254\n10.0.0.1 - 10.0.0.254\n192.168.0.0/24\n192.168.0.0/25\n8.8.8.8")
+
+    async def run():
+        return [item async for item in index.run_scan_plan(plan, None)]
+
+    results = asyncio.run(run())
+    assert sorted(target for target, _ in results) == sorted(plan.targets)
+    assert sorted(calls) == ["10.0.0.0/24", "192.168.0.0/24"]
+    assert seen["10.0.0.2/31"] == "tree:10.0.0.0/24" and seen["192.168.0.0/25"] == "tree:192.168.0.0/24"
+    assert seen["8.8.8.8/32"] is None
+    # Tiap baris input (termasuk duplikat) dapat hasil target-nya
+    assert sum(len(plan.indices[t]) for t, _ in results) == len(plan.lines) == 31
+
+def test_group_spans_attach_to_triggering_member(monkeypatch):
+    # ?trace=1: query WHOIS grup muncul di trace member pemicu, member lain dapat referensinya
+    async def fake_group_hierarchy(supernet):
+        with index.span("whois:apnic", query=f"-rB -M {supernet}"): await asyncio.sleep(0.01)
+        return None
+
+    async def fake_query(query, server=None, max_objects=None): return ""
+    traces = {}
+
+    async def fake_scan(target, deadline=None, shared_hierarchy=None, **options):
+        root = traces[target] = index.Span(target)
+        index.current_span.set(root)
+        return await index.task_apnic_hierarchy(target, include_children=False, shared_hierarchy=shared_hierarchy)
+
+    monkeypatch.setattr(index, "group_hierarchy", fake_group_hierarchy)
+    monkeypatch.setattr(index, "query_socket", fake_query)
+    monkeypatch.setattr(index, "load_apnic_index", lambda: None)
+    monkeypatch.setattr(index, "scan_ip_limited", fake_scan)
+    plan = plan_for("10.0.0.0/25\n10.0.0.128/25")
+
+    async def run():
+        return [item async for item in index.run_scan_plan(plan, None)]
+
+    asyncio.run(run())
+    groups = {t: next(c for c in traces[t].children if c.name == "scan_group") for t in plan.targets}
+    first = next(t for t, sp in groups.items() if "shared_from" not in sp.attrs)
+    other = next(t for t in plan.targets if t != first)
+    assert groups[first].attrs == {"supernet": "10.0.0.0/24"}
+    assert [c.attrs.get("query") for c in groups[first].children] == ["-rB -M 10.0.0.0/24"]
+    assert groups[other].attrs == {"supernet": "10.0.0.0/24", "shared_from": first}
+    assert groups[other].children == []
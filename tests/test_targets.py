@@ -0,0 +1,28 @@
+# parse_target / is_safe_input: klasifikasi baris input scan, termasuk IPv6 compressed
+import ipaddress
+import pytest
+import index
+
+@pytest.mark.parametrize("text", [
+    "2001:db8::1:2", "::1", "::", "fe80::1:2:3", "::ffff:1.2.3.4", "2001:db8::/32", "2001:db8:1:2::5/64",
+    " 2001:DB8::1/128 ", "1:2:3:4:5:6:7:8",
+])
+def test_compressed_ipv6(text):
+    kind, net = index.parse_target(text)
+    assert kind == "v6" and net == ipaddress.ip_network(text.strip(), strict=False)
+    assert index.is_safe_input(text) and not index.is_safe_input(text, type="ASN")
+
+@pytest.mark.parametrize("text", [
+    "2001:db8:::1", "1:2:3:4:5:6:7:8:9", "2001:db8::/129", "2001:db8::g", "::ffff:01.2.3.4", "2001:db8::1%eth0",
+    "::1/", ":", "1.2.3.4:80",
+])
+def test_bad_ipv6(text):
+    assert index.parse_target(text) is None and not index.is_safe_input(text)
+
+def test_v4_range_asn():
+    assert index.parse_target("10.0.0.1") == ("v4", ipaddress.ip_network("10.0.0.1/32"))
+    assert index.parse_target("10.0.0.9/24") == ("v4", ipaddress.ip_network("10.0.0.0/24"))
+    assert index.parse_target("10.0.0.0 - 10.0.0.5") == ("range", [ipaddress.ip_network("10.0.0.0/30"), ipaddress.ip_network("10.0.0.4/31")])
+    assert index.parse_target("as4787") == ("asn", "AS4787")
+    for text in ["01.2.3.4", "256.0.0.1", "10.0.0.0/33", "10.0.0.9 - 10.0.0.1", "AS", "1.2.3.4 - 2001:db8::1", "x" * 51]:
+        assert index.parse_target(text) is None, text
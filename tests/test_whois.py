@@ -0,0 +1,102 @@
+# WhoisConnection / WhoisPool lawan server WHOIS palsu lokal (framing -k: response ditutup 2 baris kosong)
+import asyncio
+import index
+
+def obj(name):
+    return f"inetnum: 10.0.0.0 - 10.0.0.255\nnetname: {name}\n"
+
+class FakeWhois:
+    # respond(query) -> list potongan teks yang dikirim (dengan jeda kecil di antaranya); Event = tahan dulu sampai di-set
+    def __init__(self, respond, keepalive=True):
+        self.respond, self.keepalive = respond, keepalive
+        self.commands, self.connections = [], 0
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        session = False
+        try:
+            while line := await reader.readline():
+                cmd = line.decode().strip()
+                self.commands.append(cmd)
+                session = session or (self.keepalive and cmd.startswith("-k "))
+                for part in self.respond(cmd.removeprefix("-k ")):
+                    if isinstance(part, asyncio.Event):
+                        await part.wait()
+                        continue
+                    writer.write(part.encode())
+                    await writer.drain()
+                    await asyncio.sleep(0.001)
+                if not session: break
+        finally: writer.close()
+
+def answer(query):
+    return ["% header server\n\n", obj(query), "\n" + obj(query + "-2"), "\n\n\n"]
+
+def test_keepalive_pipelined_queries_share_one_connection():
+    async def run():
+        async with FakeWhois(answer) as fake:
+            pool = index.WhoisPool("127.0.0.1", port=fake.port, size=1, depth=4)
+            first = await asyncio.gather(*(pool.query(f"q{i}") for i in range(4)))
+            second = await pool.query("q9")
+            pool.close()
+            return fake, first, second
+
+    fake, first, second = asyncio.run(run())
+    assert fake.connections == 1
+    # "-k" cuma dikirim di query pertama per koneksi
+    assert fake.commands == ["-k q0", "q1", "q2", "q3", "q9"]
+    for i, text in enumerate(first):
+        assert [o["netname"] for o in index.parse_rpsl(text) if "netname" in o] == [f"q{i}", f"q{i}-2"]
+    assert "netname: q9-2" in second
+
+def test_server_without_keepalive_ends_response_at_eof():
+    async def run():
+        async with FakeWhois(lambda q: [obj(q)], keepalive=False) as fake:
+            pool = index.WhoisPool("127.0.0.1", port=fake.port, size=1)
+            results = [await pool.query("a"), await pool.query("b")]
+            pool.close()
+            return fake, results
+
+    fake, results = asyncio.run(run())
+    assert [index.parse_rpsl(r)[0]["netname"] for r in results] == ["a", "b"]
+    # Koneksi ditutup server -> query kedua buka koneksi baru, lagi-lagi dengan "-k"
+    assert fake.connections == 2 and fake.commands == ["-k a", "-k b"]
+
+def test_max_objects_resolves_before_response_ends():
+    async def run():
+        hold = asyncio.Event()
+        def respond(query):
+            if query != "big": return answer(query)
+            return ["% header server\n\n", obj("a"), "\n", obj("b"), "\n", hold, obj("c"), "\n", obj("d"), "\n\n\n"]
+        async with FakeWhois(respond) as fake:
+            pool = index.WhoisPool("127.0.0.1", port=fake.port, size=1)
+            # Server masih nahan sisa response, query udah harus kelar begitu 2 objek lengkap
+            early = await asyncio.wait_for(pool.query("big", max_objects=2), timeout=2)
+            next_query = asyncio.ensure_future(pool.query("after"))
+            await asyncio.sleep(0.05)
+            hold.set()
+            after = await next_query
+            pool.close()
+            return fake, early, after
+
+    fake, early, after = asyncio.run(run())
+    assert [o["netname"] for o in index.parse_rpsl(early)] == ["a", "b"]
+    # Sisa response "big" (c, d) dibuang sampai terminator, nggak nyasar ke query berikutnya
+    assert [o["netname"] for o in index.parse_rpsl(after) if "netname" in o] == ["after", "after-2"]
+    assert fake.connections == 1
+
+def test_buffer_size_cap_drops_partial_object():
+    buf = index.WhoisBuffer(max_bytes=70)
+    data = (obj("a") + "\n" + obj("b") + "\n").encode()
+    assert buf.feed(data[:30]) is False
+    assert buf.feed(data[30:]) is True and buf.truncated
+    assert len(buf.data) == 70
+    assert [o["netname"] for o in index.parse_rpsl(buf.text())] == ["a"]
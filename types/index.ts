@@ -10,4 +10,20 @@ export interface ScanResult {
   irr_objects: string;
   ptr_record: string; // Ini buat Reverse DNS
   upstreams?: string; // Ini buat Upstream
+  ptr_coverage?: string; // Ini buat PTR sweep (opsional)
+  timed_out?: string[]; // Task yang kena deadline, semua atau sebagian field-nya bernilai "⏱ Timed out"
+  unavailable?: string[]; // Task yang di-skip karena circuit breaker upstream kebuka
+  trace?: TraceSpan; // Cuma ada kalau request pakai ?trace=1
+}
+
+export interface TraceSpan {
+  name: string;
+  start_ms: number; // Offset dari awal scan CIDR ini
+  duration_ms: number | null; // null = masih jalan waktu hasil dikirim
+  outcome: string;
+  query?: string;
+  cache?: "hit" | "miss" | "shared";
+  wait_ms?: number; // Antri di limiter upstream
+  bytes?: number;
+  children: TraceSpan[];
 }
\ No newline at end of file